@@ -1,23 +1,43 @@
 """Core build logic for PGN curation."""
 
 import os
-from typing import Dict, List, Tuple
+from array import array
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
 from rich.console import Console
 from rich.table import Table
 
 from .models import Config, ColorConfig, Game
 from .pgn_processor import (
-    parse_pgn,
+    index_pgn,
+    iter_pgn,
+    read_game_at,
     filter_game_variations,
-    trim_game_depth,
-    count_variations,
-    get_average_depth,
+    filter_trim_count,
+    get_variation_stats,
     write_pgn,
 )
 
 
 console = Console()
 
+# Markup prefixes for the per-game progress lines
+_OK = "[green]✓[/green]"
+_WARN = "[yellow]⚠[/yellow]"
+_SKIP = "[red]✗[/red]"
+_HEADERS_ONLY = "[yellow]⊘[/yellow]"
+_DRY_RUN = "[yellow][DRY RUN][/yellow]"
+
+# Below this many source games, worker start-up costs more than it saves
+MIN_PARALLEL_GAMES = 4
+
+# Source games sent to a worker process at a time
+PARALLEL_CHUNK_SIZE = 16
+
+# Processed games are pickled back from workers, and pickle recurses once
+# per ply; deeper trims are built in-process
+PARALLEL_MAX_DEPTH = 128
+
 
 class BuildStats:
     """Statistics for build process."""
@@ -47,7 +67,28 @@ class ColorBuildStats:
         self.output_avg_depth = 0.0
         self.output_size = 0
         self.output_files = []  # List of output filenames
-        self.game_stats = []  # List of (game_index, game_name, variations_before, variations_after)
+
+        # Per-game stats as parallel arrays (compact for large PGNs)
+        self.game_indices = array("q")  # 1-based source game index
+        self.game_names = []
+        self.variations_before = array("q")
+        self.variations_after = array("q")
+
+    def add_game_stats(
+        self, game_index: int, game_name: str, variations_before: int, variations_after: int
+    ):
+        """Record variation counts for one output game."""
+        self.game_indices.append(game_index)
+        self.game_names.append(game_name)
+        self.variations_before.append(variations_before)
+        self.variations_after.append(variations_after)
+
+    @property
+    def game_stats(self) -> List[Tuple[int, str, int, int]]:
+        """List of (game_index, game_name, variations_before, variations_after)."""
+        return list(zip(
+            self.game_indices, self.game_names, self.variations_before, self.variations_after
+        ))
 
 
 def build(config: Config, dry_run: bool = False, verbose: bool = False, depth: int = 10, split: bool = False) -> BuildStats:
@@ -73,29 +114,72 @@ def build(config: Config, dry_run: bool = False, verbose: bool = False, depth: i
     if verbose:
         console.print(f"[cyan]Reading source PGN:[/cyan] {config.source}")
 
-    source_games = parse_pgn(config.source)
-    stats.input_games = len(source_games)
+    # Index games by header only; move text is parsed one game at a time below
+    offsets = index_pgn(config.source)
+    stats.input_games = len(offsets)
     stats.input_size = os.path.getsize(config.source)
 
-    # Calculate input statistics
-    for game in source_games:
-        stats.input_variations += count_variations(game)
+    # Expand shorthand syntax into games lists and record which game configs
+    # (across all colors) refer to each source game. Configs are looked up
+    # for every source game in order, so keep them in a list indexed by
+    # source position; out-of-range indices are reported when assembling.
+    color_configs = []
+    game_refs = [[] for _ in range(stats.input_games)]  # [(color pos, game pos)]
+    for color_pos, color_config in enumerate(config.configs):
+        color_config = expand_shorthand_to_games(color_config, stats.input_games)
+        color_configs.append(color_config)
+        for game_pos, game_config in enumerate(color_config.games):
+            if 0 <= game_config.index < stats.input_games:
+                game_refs[game_config.index].append((color_pos, game_pos))
+
+    processed_games = [[None] * len(c.games) for c in color_configs]
+
+    # Per-color constants: header used for game names, default max depth
+    color_header_fields = [
+        "Black" if c.color == "black" else "White" for c in color_configs
+    ]
+    color_max_depths = [calculate_max_depth(c.color, depth) for c in color_configs]
+
+    # Game configs to apply to each source game, with the header field and
+    # default max depth of their color
+    game_jobs = [
+        [
+            (
+                color_configs[color_pos].games[game_pos],
+                color_header_fields[color_pos],
+                color_max_depths[color_pos],
+            )
+            for color_pos, game_pos in refs
+        ]
+        for refs in game_refs
+    ]
+
+    # Gather input statistics and apply every color's config to a game while
+    # it is loaded, so source games are never all held in memory at once
+    total_depth = 0.0
+    results = _process_source_games(config.source, offsets, game_jobs)
+    for refs, (source_variations, avg_depth, game_results) in zip(game_refs, results):
+        stats.input_variations += source_variations
+        total_depth += avg_depth
+
+        for (color_pos, game_pos), result in zip(refs, game_results):
+            processed_games[color_pos][game_pos] = result
 
     if stats.input_variations > 0:
-        total_depth = sum(get_average_depth(g) for g in source_games)
-        stats.input_avg_depth = total_depth / len(source_games)
+        stats.input_avg_depth = total_depth / stats.input_games
 
     if verbose:
         console.print(
-            f"[green]✓[/green] Loaded {stats.input_games} game(s), "
+            f"{_OK} Loaded {stats.input_games} game(s), "
             f"{stats.input_variations} variations"
         )
 
-    # Process each color configuration
-    for color_config in config.configs:
+    # Assemble output for each color configuration
+    for color_config, color_processed in zip(color_configs, processed_games):
         color_stats = build_color_config(
             color_config,
-            source_games,
+            color_processed,
+            stats.input_games,
             output_prefix,
             depth,
             dry_run,
@@ -111,9 +195,190 @@ def build(config: Config, dry_run: bool = False, verbose: bool = False, depth: i
     return stats
 
 
+def _process_source_games(
+    pgn_path: str,
+    offsets: List[int],
+    game_jobs: List[List[Tuple[Game, str, int]]],
+) -> Iterator[Tuple[int, float, list]]:
+    """
+    Apply game configs to every source game, in parallel when worthwhile.
+
+    Source games are independent and CPU-bound (parsing dominates), so with
+    enough games and cores each one is parsed and processed in a worker
+    process. Otherwise the source is streamed in this process.
+
+    Args:
+        pgn_path: Source PGN path
+        offsets: Game offsets from index_pgn
+        game_jobs: Per source game, (game_config, header_field, max_depth)
+            for each game config that refers to it
+
+    Yields:
+        Tuple of (source variations, source average depth, process_game
+        results in game_jobs order) per source game, in file order
+    """
+    deepest = max(
+        (
+            game_config.max_depth or max_depth
+            for jobs in game_jobs
+            for game_config, _, max_depth in jobs
+        ),
+        default=0,
+    )
+    workers = os.cpu_count() or 1
+
+    if (
+        len(offsets) < MIN_PARALLEL_GAMES
+        or workers < 2
+        or deepest > PARALLEL_MAX_DEPTH
+    ):
+        for source_game, jobs in zip(iter_pgn(pgn_path), game_jobs):
+            yield _apply_game_configs(source_game, jobs)
+        return
+
+    # Small chunks keep every worker busy when there are few (large) games
+    chunk_size = max(1, min(PARALLEL_CHUNK_SIZE, len(offsets) // (4 * workers)))
+    tasks = ((pgn_path, offset, jobs) for offset, jobs in zip(offsets, game_jobs))
+    with ProcessPoolExecutor() as executor:
+        yield from executor.map(
+            _process_source_game_worker, tasks, chunksize=chunk_size
+        )
+
+
+def _process_source_game_worker(job: tuple) -> Tuple[int, float, list]:
+    """
+    Parse one source game and apply its game configs (runs in a worker process).
+
+    Args:
+        job: Tuple of (pgn_path, offset, game jobs) with an offset from
+            index_pgn and game jobs as in _process_source_games
+
+    Returns:
+        Same as _apply_game_configs
+    """
+    pgn_path, offset, jobs = job
+    return _apply_game_configs(read_game_at(pgn_path, offset), jobs)
+
+
+def _apply_game_configs(
+    source_game, jobs: List[Tuple[Game, str, int]]
+) -> Tuple[int, float, list]:
+    """
+    Gather a source game's statistics and apply each game config to it.
+
+    Args:
+        source_game: Parsed source game
+        jobs: (game_config, header_field, max_depth) per game config
+
+    Returns:
+        Tuple of (source variations, source average depth, list of
+        process_game results in jobs order)
+    """
+    source_variations, avg_depth = get_variation_stats(source_game)
+
+    # Game configs with identical filters and depth (typically the same
+    # game in both colors) share one filtered game
+    filtered_cache = {}
+    results = [
+        process_game(
+            source_game,
+            source_variations,
+            game_config,
+            header_field,
+            max_depth,
+            filtered_cache,
+        )
+        for game_config, header_field, max_depth in jobs
+    ]
+    return source_variations, avg_depth, results
+
+
+def calculate_max_depth(color: str, depth: int) -> int:
+    """
+    Convert a depth in move pairs to half-moves for a repertoire color.
+
+    Args:
+        color: Repertoire color ("white" or "black")
+        depth: Number of move pairs
+
+    Returns:
+        Maximum depth in half-moves (plies)
+    """
+    if color == "white":
+        return 2 * depth + 1
+    return 2 * depth  # black
+
+
+def process_game(
+    source_game,
+    source_variations: int,
+    game_config: Game,
+    header_field: str,
+    calculated_max_depth: int,
+    filtered_cache: Optional[Dict[tuple, Tuple[object, int, float]]] = None
+) -> Tuple[str, int, object, int, float]:
+    """
+    Apply a single game configuration to a source game.
+
+    Args:
+        source_game: Parsed source game
+        source_variations: Variation count of the source game
+        game_config: Configuration for this game (0-based index)
+        header_field: Header holding the game name ("White" or "Black")
+        calculated_max_depth: Max depth in half-moves unless overridden per game
+        filtered_cache: Optional cache of filter_trim_count results for this
+            source game, keyed by filters and max depth. Cached games are
+            shared, so they must not be modified by the caller.
+
+    Returns:
+        Tuple of (game_name, variations_before, processed_game,
+        variations_after, avg_depth_after): the game's display name, the
+        source game's variation count, the filtered and trimmed game (None
+        when the game is skipped), its variation count and its average
+        variation depth in half-moves (0.0 when it has no variations).
+    """
+    game_name = game_config.name or source_game.headers.get(
+        header_field, f"Game {game_config.index + 1}"
+    )
+
+    if game_config.action == "skip":
+        return game_name, source_variations, None, 0, 0.0
+
+    if game_config.action == "skip_keep_headers":
+        filtered_game = filter_game_variations(source_game, game_config)
+        return game_name, source_variations, filtered_game, 0, 0.0
+
+    # Filter variations and apply depth trimming in a single pass
+    # Use per-game override if specified, otherwise use calculated max_depth
+    max_depth = game_config.max_depth or calculated_max_depth
+
+    if filtered_cache is None:
+        return (game_name, source_variations) + filter_trim_count(
+            source_game, game_config, max_depth
+        )
+
+    cache_key = (
+        _filter_signature(game_config.remove_variations),
+        _filter_signature(game_config.add_variations),
+        max_depth,
+    )
+    cached = filtered_cache.get(cache_key)
+    if cached is None:
+        cached = filter_trim_count(source_game, game_config, max_depth)
+        filtered_cache[cache_key] = cached
+
+    return (game_name, source_variations) + cached
+
+
+def _filter_signature(filters) -> tuple:
+    """Hashable summary of the variation filters that affect the result."""
+    return tuple((f.moves, f.depth) for f in filters or ())
+
+
 def build_color_config(
     color_config: ColorConfig,
-    source_games: List,
+    processed_games: List[Optional[Tuple[str, int, object, int, float]]],
+    total_games: int,
     output_prefix: str,
     depth: int,
     dry_run: bool,
@@ -124,8 +389,10 @@ def build_color_config(
     Build output for a single color configuration.
 
     Args:
-        color_config: Color-specific configuration
-        source_games: Parsed source PGN games
+        color_config: Color-specific configuration with expanded games list
+        processed_games: process_game() result for each entry of
+            color_config.games, or None if its index is out of range
+        total_games: Number of games in the source PGN
         output_prefix: Output filename prefix
         depth: Number of move pairs
         dry_run: Preview mode
@@ -137,99 +404,76 @@ def build_color_config(
     """
     color_stats = ColorBuildStats(color_config.color)
 
-    # Calculate max_depth based on color
-    if color_config.color == "white":
-        calculated_max_depth = 2 * depth + 1
-    else:  # black
-        calculated_max_depth = 2 * depth
+    calculated_max_depth = calculate_max_depth(color_config.color, depth)
 
     if verbose:
         console.print(f"\n[bold cyan]Processing {color_config.color.upper()} repertoire:[/bold cyan]")
 
-    # Expand shorthand syntax into games list if needed
-    color_config = expand_shorthand_to_games(color_config, len(source_games))
-
     # Process games
     output_games = []
     output_game_indices = []  # Track original source game indices (1-based)
+    output_total_depth = 0.0
 
-    for game_config in color_config.games:
-        if game_config.index >= len(source_games):
+    for game_config, processed in zip(color_config.games, processed_games):
+        if processed is None:
             if verbose:
                 console.print(
-                    f"  [yellow]⚠[/yellow] Game index {game_config.index + 1} out of range "
-                    f"(only {len(source_games)} games), skipping"
+                    f"  {_WARN} Game index {game_config.index + 1} out of range "
+                    f"(only {total_games} games), skipping"
                 )
             continue
 
-        source_game = source_games[game_config.index]
-        # Use appropriate header based on color
-        header_field = "Black" if color_config.color == "black" else "White"
-        game_name = game_config.name or source_game.headers.get(
-            header_field, f"Game {game_config.index + 1}"
-        )
-
-        # Count variations in source game (before any processing)
-        source_variations = count_variations(source_game)
+        game_name, source_variations, filtered_game, variations_after, avg_depth_after = processed
 
         # Process based on action
         if game_config.action == "skip":
             if verbose:
                 console.print(
-                    f"  [red]✗[/red] Game [{game_config.index + 1}] {game_name}: Skipped completely"
+                    f"  {_SKIP} Game [{game_config.index + 1}] {game_name}: Skipped completely"
                 )
             continue
 
         if game_config.action == "skip_keep_headers":
-            filtered_game = filter_game_variations(source_game, game_config)
             output_games.append(filtered_game)
             output_game_indices.append(game_config.index + 1)  # Store 1-based index
             if verbose:
                 console.print(
-                    f"  [yellow]⊘[/yellow] Game [{game_config.index + 1}] {game_name}: "
+                    f"  {_HEADERS_ONLY} Game [{game_config.index + 1}] {game_name}: "
                     "Headers preserved, variations removed"
                 )
             # Track stats - all variations removed
-            color_stats.game_stats.append((
+            color_stats.add_game_stats(
                 game_config.index + 1,
                 game_name,
                 source_variations,
                 0
-            ))
+            )
             continue
 
-        # Filter variations
-        filtered_game = filter_game_variations(source_game, game_config)
-
         if filtered_game is None:
             continue
 
-        # Apply depth trimming
-        # Use per-game override if specified, otherwise use calculated max_depth
-        max_depth = game_config.max_depth or calculated_max_depth
-        filtered_game = trim_game_depth(filtered_game, max_depth)
-
-        variations_after = count_variations(filtered_game)
-
         # Skip empty games if configured
         if color_config.settings.remove_empty_games and variations_after == 0:
             if verbose:
                 console.print(
-                    f"  [yellow]⚠[/yellow] Game [{game_config.index + 1}] {game_name}: "
+                    f"  {_WARN} Game [{game_config.index + 1}] {game_name}: "
                     "Removed (no variations after filtering)"
                 )
             continue
 
         output_games.append(filtered_game)
         output_game_indices.append(game_config.index + 1)  # Store 1-based index
+        color_stats.output_variations += variations_after
+        output_total_depth += avg_depth_after
 
         # Track stats for this game (source variations vs final variations)
-        color_stats.game_stats.append((
+        color_stats.add_game_stats(
             game_config.index + 1,  # 1-based index
             game_name,
             source_variations,  # Original count from source
             variations_after    # Final count after filtering and trimming
-        ))
+        )
 
         # Report
         if verbose:
@@ -239,25 +483,30 @@ def build_color_config(
             if remove_count > 0:
                 filter_info = f", {remove_count} remove filter(s)"
             if add_count > 0:
-                filter_info += f", {add_count} add filter(s)" if filter_info else f", {add_count} add filter(s)"
+                filter_info += f", {add_count} add filter(s)"
 
+            max_depth = game_config.max_depth or calculated_max_depth
             depth_info = ""
             if max_depth:
                 depth_info = f", trimmed to {max_depth} moves"
 
             console.print(
-                f"  [green]✓[/green] Game [{game_config.index + 1}] {game_name}: "
+                f"  {_OK} Game [{game_config.index + 1}] {game_name}: "
                 f"{variations_after} variation(s){filter_info}{depth_info}"
             )
 
     # Calculate output statistics for this color
     color_stats.output_games = len(output_games)
-    for game in output_games:
-        color_stats.output_variations += count_variations(game)
-
     if color_stats.output_variations > 0 and len(output_games) > 0:
-        total_depth = sum(get_average_depth(g) for g in output_games if g)
-        color_stats.output_avg_depth = total_depth / len(output_games)
+        color_stats.output_avg_depth = output_total_depth / len(output_games)
+
+    if split:
+        # Construct filenames: {prefix}_{color}_{depth}_{game_index}.pgn
+        # game_index is from original source file (1-based)
+        game_filenames = [
+            f"{output_prefix}_{color_config.color}_{depth}_{original_game_index}.pgn"
+            for original_game_index in output_game_indices
+        ]
 
     # Write output
     if not dry_run:
@@ -266,19 +515,22 @@ def build_color_config(
             if verbose:
                 console.print(f"  [cyan]Writing output (split mode):[/cyan]")
 
+            add_metadata = color_config.settings.add_curation_comment
+
+            def write_one(game, game_filename):
+                return write_pgn([game], game_filename, add_metadata)
+
+            # Each file is independent, so write them concurrently
+            with ThreadPoolExecutor() as executor:
+                file_sizes = list(executor.map(write_one, output_games, game_filenames))
+
             total_size = 0
-            for i, game in enumerate(output_games):
-                # Construct filename: {prefix}_{color}_{depth}_{game_index}.pgn
-                # game_index is from original source file (1-based)
-                original_game_index = output_game_indices[i]
-                game_filename = f"{output_prefix}_{color_config.color}_{depth}_{original_game_index}.pgn"
-                write_pgn([game], game_filename, color_config.settings.add_curation_comment)
-                file_size = os.path.getsize(game_filename)
+            for game_filename, file_size in zip(game_filenames, file_sizes):
                 total_size += file_size
                 color_stats.output_files.append(game_filename)
 
                 if verbose:
-                    console.print(f"    [green]✓[/green] {game_filename}")
+                    console.print(f"    {_OK} {game_filename}")
 
             color_stats.output_size = total_size
         else:
@@ -288,28 +540,27 @@ def build_color_config(
             if verbose:
                 console.print(f"  [cyan]Writing output:[/cyan] {final_output}")
 
-            write_pgn(output_games, final_output, color_config.settings.add_curation_comment)
-            color_stats.output_size = os.path.getsize(final_output)
+            color_stats.output_size = write_pgn(
+                output_games, final_output, color_config.settings.add_curation_comment
+            )
             color_stats.output_files.append(final_output)
 
             if verbose:
-                console.print(f"  [green]✓[/green] Written successfully")
+                console.print(f"  {_OK} Written successfully")
     else:
         # Dry run mode
         if split:
             if verbose:
-                console.print(f"  [yellow][DRY RUN][/yellow] Would write {len(output_games)} files:")
-            for i in range(len(output_games)):
-                original_game_index = output_game_indices[i]
-                game_filename = f"{output_prefix}_{color_config.color}_{depth}_{original_game_index}.pgn"
-                color_stats.output_files.append(game_filename)
-                if verbose:
+                console.print(f"  {_DRY_RUN} Would write {len(output_games)} files:")
+            color_stats.output_files.extend(game_filenames)
+            if verbose:
+                for game_filename in game_filenames:
                     console.print(f"    - {game_filename}")
         else:
             final_output = f"{output_prefix}_{color_config.color}_{depth}.pgn"
             color_stats.output_files.append(final_output)
             if verbose:
-                console.print(f"  [yellow][DRY RUN][/yellow] Would write to: {final_output}")
+                console.print(f"  {_DRY_RUN} Would write to: {final_output}")
 
     return color_stats
 
@@ -339,44 +590,20 @@ def expand_shorthand_to_games(color_config: ColorConfig, total_games: int) -> Co
     # Generate games list from shorthand
     games_list = []
 
-    if hasattr(color_config, "_use_skip") and color_config._use_skip:
-        # Skip mode: include all games EXCEPT those in skip list
-        skip_indices = color_config._skip_indices  # 1-based
-        for i in range(total_games):
-            # Check if this game has detailed config
-            if i in existing_games_map:
-                games_list.append(existing_games_map[i])  # Use detailed config
-                continue
-
-            game_num = i + 1  # 1-based for display/config
-            if game_num in skip_indices:
-                # Create with 1-based, then convert to 0-based
-                game = Game(index=game_num, action="skip")
-                game.index = i  # Convert to 0-based internally
-                games_list.append(game)
-            else:
-                game = Game(index=game_num, action="include")
-                game.index = i  # Convert to 0-based internally
-                games_list.append(game)
-
-    elif hasattr(color_config, "_use_include") and color_config._use_include:
-        # Include mode: skip all games EXCEPT those in include list
-        include_indices = color_config._include_indices  # 1-based
-        for i in range(total_games):
-            # Check if this game has detailed config
-            if i in existing_games_map:
-                games_list.append(existing_games_map[i])  # Use detailed config
-                continue
-
-            game_num = i + 1  # 1-based for display/config
-            if game_num in include_indices:
-                game = Game(index=game_num, action="include")
-                game.index = i  # Convert to 0-based internally
-                games_list.append(game)
-            else:
-                game = Game(index=game_num, action="skip")
-                game.index = i  # Convert to 0-based internally
-                games_list.append(game)
+    # Games without detailed config follow the skip/include shorthand
+    for i in range(total_games):
+        # Check if this game has detailed config
+        detailed = existing_games_map.get(i)
+        if detailed is not None:
+            games_list.append(detailed)  # Use detailed config
+            continue
+
+        game_num = i + 1  # 1-based for display/config
+        action = "include" if color_config.is_included(game_num) else "skip"
+        # Create with 1-based, then convert to 0-based
+        game = Game(index=game_num, action=action)
+        game.index = i  # Convert to 0-based internally
+        games_list.append(game)
 
     color_config.games = games_list
     return color_config
@@ -420,7 +647,7 @@ def print_statistics(stats: BuildStats):
         console.print(table)
 
         # Show per-game details
-        if color_stats.game_stats:
+        if color_stats.game_names:
             console.print(f"\n  [bold]Per-Game Details:[/bold]")
             game_table = Table(show_header=True, header_style=f"bold {color}")
             game_table.add_column("Game", style="dim")
@@ -429,7 +656,12 @@ def print_statistics(stats: BuildStats):
             game_table.add_column("After", justify="right")
             game_table.add_column("Change", justify="right")
 
-            for game_idx, game_name, var_before, var_after in color_stats.game_stats:
+            for game_idx, game_name, var_before, var_after in zip(
+                color_stats.game_indices,
+                color_stats.game_names,
+                color_stats.variations_before,
+                color_stats.variations_after,
+            ):
                 change = var_after - var_before
                 if change < 0:
                     change_str = f"[red]{change} ({(change/var_before)*100:.1f}%)[/red]"
@@ -464,10 +696,11 @@ def print_statistics(stats: BuildStats):
     console.print(table)
 
 
+_SIZE_UNITS = ("B", "KB", "MB", "GB", "TB")
+
+
 def _format_bytes(size: int) -> str:
     """Format byte size in human-readable format."""
-    for unit in ["B", "KB", "MB", "GB"]:
-        if size < 1024.0:
-            return f"{size:.1f}{unit}"
-        size /= 1024.0
-    return f"{size:.1f}TB"
+    # Each unit covers 10 more bits; sizes just under a boundary stay in the lower unit
+    unit = min((size.bit_length() - 1) // 10, len(_SIZE_UNITS) - 1) if size > 0 else 0
+    return f"{size / (1 << (10 * unit)):.1f}{_SIZE_UNITS[unit]}"
@@ -4,12 +4,9 @@ import click
 from rich.console import Console
 
 from . import __version__
-from .config import load_config, validate_config_file
-from .builder import build, print_statistics
-from .inspector import inspect_pgn, generate_starter_config
-from .lichess import upload_pgn_to_study, save_token, load_token
-from .comparator import compare_pgn_files
-from .yaml_generator import generate_replication_yaml
+
+# Command modules pull in chess, pydantic, yaml and requests, so each
+# command imports only what it needs when it runs.
 
 
 console = Console()
@@ -54,6 +51,9 @@ def build_cmd(config_file, dry_run, verbose, quiet, stats, output, depth, split)
 
         pgnc build john_config.yaml --verbose --stats
     """
+    from .config import load_config
+    from .builder import build, print_statistics
+
     try:
         # Load config
         config = load_config(config_file)
@@ -112,6 +112,8 @@ def validate(config_file):
 
         pgnc validate john_config.yaml
     """
+    from .config import validate_config_file
+
     console.print(f"\n[cyan]Validating:[/cyan] {config_file}\n")
 
     is_valid, message = validate_config_file(config_file)
@@ -144,6 +146,8 @@ def inspect(pgn_file, game, list_variations):
 
         pgnc inspect openings_2025.pgn --game 1 --list-variations  # List variations for game 1
     """
+    from .inspector import inspect_pgn
+
     try:
         inspect_pgn(pgn_file, game_index=game, list_variations=list_variations)
     except Exception as e:
@@ -167,6 +171,8 @@ def init(pgn_file, output):
 
         pgnc init openings_2025.pgn -o my_config.yaml
     """
+    from .inspector import generate_starter_config
+
     try:
         generate_starter_config(pgn_file, output)
     except Exception as e:
@@ -195,7 +201,20 @@ def init(pgn_file, output):
     help="Existing study ID (REQUIRED - create study manually on lichess.org first). "
          "Get this from your study URL (e.g., 'ABC123' from https://lichess.org/study/ABC123)"
 )
-def upload(pgn_file, name, private, token, study_id):
+@click.option(
+    "--workers",
+    type=int,
+    default=None,
+    help="Chapters to upload concurrently if the single bulk import is rejected "
+         "(default: a small limit that respects Lichess rate limits; "
+         "use 1 to keep file order)"
+)
+@click.option(
+    "--verify",
+    is_flag=True,
+    help="Check the token with Lichess before uploading, even if it was verified recently"
+)
+def upload(pgn_file, name, private, token, study_id, workers, verify):
     """
     Upload PGN file to Lichess as a study.
 
@@ -214,6 +233,9 @@ def upload(pgn_file, name, private, token, study_id):
 
         pgnc upload my_repertoire.pgn --study-id ABC123 --token YOUR_TOKEN
     """
+    from rich.prompt import Prompt
+    from .lichess import upload_pgn_to_study, save_token, load_token
+
     try:
         visibility = "private" if private else "public"
         
@@ -251,6 +273,8 @@ def upload(pgn_file, name, private, token, study_id):
             api_token=api_token,
             visibility=visibility,
             study_id=study_id,
+            max_workers=workers,
+            verify=verify,
         )
         
         console.print(f"\n[green]✅ Upload complete![/green]")
@@ -302,6 +326,9 @@ def compare(pgn1, pgn2, game1, game2, output, color, depth):
         # Compare specific games with depth limit
         pgnc compare old.pgn new.pgn --game1 1 --game2 1 --color black --depth 15
     """
+    from .comparator import iter_compare_pgn_files
+    from .yaml_generator import generate_replication_yaml
+
     try:
         from pathlib import Path
 
@@ -330,24 +357,20 @@ def compare(pgn1, pgn2, game1, game2, output, color, depth):
 
         console.print()
 
-        # Perform comparison
-        comparisons = compare_pgn_files(
+        # Perform comparison, showing each game's differences as it completes
+        comparisons = []
+        for comparison in iter_compare_pgn_files(
             pgn1,
             pgn2,
             game1_idx=game1,
             game2_idx=game2,
             color=color,
             depth=depth
-        )
-
-        if not comparisons:
-            console.print("[green]✓[/green] No differences found between the games!")
-            return
-
-        # Show summary
-        console.print(f"[bold]Found differences in {len(comparisons)} game(s):[/bold]\n")
+        ):
+            if not comparisons:
+                console.print("[bold]Games with differences:[/bold]\n")
+            comparisons.append(comparison)
 
-        for comparison in comparisons:
             console.print(f"  [cyan]Game [{comparison.game2_index}]:[/cyan] {comparison.game2_name}")
             console.print(
                 f"    Variations: {comparison.total_variations_game1} → "
@@ -361,6 +384,13 @@ def compare(pgn1, pgn2, game1, game2, output, color, depth):
 
             console.print()
 
+        if not comparisons:
+            console.print("[green]✓[/green] No differences found between the games!")
+            return
+
+        # Show summary
+        console.print(f"[bold]Found differences in {len(comparisons)} game(s)[/bold]\n")
+
         # Generate YAML
         console.print(f"[cyan]Generating replication YAML:[/cyan] {output}")
 
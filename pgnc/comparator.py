@@ -1,19 +1,44 @@
 """PGN comparison logic for detecting differences between games."""
 
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
 import chess
 import chess.pgn
-from typing import List, Tuple, Set
+from typing import Iterator, List, Tuple, Set
 from dataclasses import dataclass
 
-from .pgn_processor import parse_pgn, trim_game_depth, filter_game_variations
+from .pgn_processor import (
+    index_pgn,
+    read_game_at,
+    filter_game_variations,
+    filter_trim_count,
+)
 from .prefix_optimizer import optimize_variation_list
 from .models import Game as GameConfig, VariationFilter
 
 
+# Below this many game pairs, worker start-up costs more than it saves
+MIN_PARALLEL_GAMES = 4
+
+
 @dataclass
 class ComparisonResult:
     """Result of comparing two games."""
 
+    # Declared by hand rather than dataclass(slots=True), which needs Python 3.10
+    __slots__ = (
+        "game1_index",
+        "game2_index",
+        "game1_name",
+        "game2_name",
+        "added_variations",
+        "removed_variations",
+        "total_variations_game1",
+        "total_variations_game2",
+    )
+
     game1_index: int  # 1-based index in first PGN
     game2_index: int  # 1-based index in second PGN
     game1_name: str
@@ -30,7 +55,8 @@ class ComparisonResult:
 
 def _apply_remove_variations(
     game: chess.pgn.Game,
-    remove_variations: List[str]
+    remove_variations: List[str],
+    max_depth: int = None
 ) -> chess.pgn.Game:
     """
     Apply remove_variations to a game to create a filtered game.
@@ -38,6 +64,7 @@ def _apply_remove_variations(
     Args:
         game: Source game
         remove_variations: List of move sequences to remove
+        max_depth: Optional depth limit (in half-moves) to trim the result to
 
     Returns:
         Filtered game with specified variations removed
@@ -58,47 +85,87 @@ def _apply_remove_variations(
         remove_variations=variation_filters
     )
 
-    # Apply the filter
-    filtered_game = filter_game_variations(game, game_config)
+    # Apply the filter, trimming in the same pass if needed
+    if max_depth:
+        filtered_game, _, _ = filter_trim_count(game, game_config, max_depth)
+    else:
+        filtered_game = filter_game_variations(game, game_config)
 
     return filtered_game
 
 
-def extract_all_variation_paths(game: chess.pgn.Game) -> Set[str]:
+def extract_all_variation_paths(game: chess.pgn.Game) -> Set[Tuple[str, ...]]:
     """
     Extract all variation paths from a game as move sequences.
 
     Uses deterministic DFS traversal (variations by index order).
+    Paths are kept as SAN tuples; use _format_move_sequence to turn one
+    into PGN text.
 
     Args:
         game: Chess game to extract variations from
 
     Returns:
-        Set of variation move sequences (e.g., {"1.e4 c5 2.Nf3 d6", ...})
+        Set of variation move sequences (e.g., {("e4", "c5", "Nf3", "d6"), ...})
     """
-    variations = set()
+    return _variation_paths(game)
 
-    def traverse(node, board, moves_san=[]):
-        """Deterministic DFS: iterate variations by index (0, 1, 2, ...)."""
-        if not node.variations:
-            # Leaf node - this is a complete variation
-            formatted = _format_move_sequence(moves_san)
-            variations.add(formatted)
-            return
 
-        # Traverse variations in index order (deterministic)
-        for variation in node.variations:
-            new_board = board.copy()
-            move_san = new_board.san(variation.move)
-            new_board.push(variation.move)
+def _variation_paths(
+    game: chess.pgn.Game, max_depth: int = None
+) -> Set[Tuple[str, ...]]:
+    """
+    Extract all variation paths from a game as SAN tuples.
+
+    Move strings are interned, so comparing paths from different games
+    mostly compares string identities.
 
-            traverse(variation, new_board, moves_san + [move_san])
+    Args:
+        game: Chess game to extract variations from
+        max_depth: Optional depth limit (in half-moves); paths are cut off
+            there, as if the game had been trimmed with trim_game_depth
 
-    traverse(game, game.board())
+    Returns:
+        Set of SAN tuples, one per variation
+    """
+    if not game.variations:
+        return {()}
+
+    variations = set()
+
+    # Iterative DFS over a single board: push on descend, pop on backtrack
+    board = game.board()
+    moves_san = []
+    stack = [iter(game.variations)]
+
+    while stack:
+        variation = next(stack[-1], None)
+        if variation is None:
+            # All children visited - backtrack
+            stack.pop()
+            if moves_san:
+                board.pop()
+                moves_san.pop()
+            continue
+
+        moves_san.append(sys.intern(board.san_and_push(variation.move)))
+
+        if variation.variations and len(moves_san) != max_depth:
+            stack.append(iter(variation.variations))
+        else:
+            # Leaf node - this is a complete variation
+            variations.add(tuple(moves_san))
+            board.pop()
+            moves_san.pop()
 
     return variations
 
 
+# Prebuilt "1.", "2.", ... prefixes for the first 100 moves
+_MAX_TABLE_PLIES = 200
+_MOVE_NUMBERS = [f"{n}." for n in range(1, _MAX_TABLE_PLIES // 2 + 1)]
+
+
 def _format_move_sequence(moves_san: List[str]) -> str:
     """
     Format a list of moves in SAN notation to PGN format with move numbers.
@@ -112,14 +179,11 @@ def _format_move_sequence(moves_san: List[str]) -> str:
     if not moves_san:
         return ""
 
-    formatted = []
-    for i, move in enumerate(moves_san):
-        if i % 2 == 0:
-            # White move - add move number
-            formatted.append(f"{i // 2 + 1}.{move}")
-        else:
-            # Black move - just the move
-            formatted.append(move)
+    # Black moves are used as-is; only white moves (even plies) get a number
+    formatted = list(moves_san)
+    for i in range(0, len(formatted), 2):
+        number = _MOVE_NUMBERS[i // 2] if i < _MAX_TABLE_PLIES else f"{i // 2 + 1}."
+        formatted[i] = number + formatted[i]
 
     return " ".join(formatted)
 
@@ -144,40 +208,62 @@ def compare_games(
     Returns:
         ComparisonResult with differences
     """
-    # Apply depth trimming if specified
-    if max_depth:
-        game1 = trim_game_depth(game1, max_depth)
-        game2 = trim_game_depth(game2, max_depth)
+    # Depth trimming is applied while walking the games rather than by
+    # making trimmed copies of them
+    max_depth = max_depth or None
 
     # ==================== PHASE 1: REMOVE ====================
     # Extract variation paths from both games
-    variations1 = extract_all_variation_paths(game1)
-    variations2 = extract_all_variation_paths(game2)
+    variations1 = _variation_paths(game1, max_depth)
+    variations2 = _variation_paths(game2, max_depth)
+
+    # Get game names from headers
+    game1_name = game1.headers.get("White", f"Game {game1_index}")
+    game2_name = game2.headers.get("White", f"Game {game2_index}")
+
+    if variations1 == variations2:
+        # Identical variation sets: nothing to remove or add
+        return ComparisonResult(
+            game1_index=game1_index,
+            game2_index=game2_index,
+            game1_name=game1_name,
+            game2_name=game2_name,
+            added_variations=[],
+            removed_variations=[],
+            total_variations_game1=len(variations1),
+            total_variations_game2=len(variations2)
+        )
 
     # Find variations to remove: in game1 but NOT in game2
-    to_remove = variations1 - variations2
-    to_remove_list = sorted(list(to_remove))
+    # No sorting needed: the optimizer's result does not depend on input
+    # order and it sorts its own output
+    to_remove_list = [_format_move_sequence(path) for path in variations1 - variations2]
 
     # Optimize remove_variations against game1 (original structure)
-    optimized_removed = optimize_variation_list(to_remove_list, reference_game=game1)
+    # The optimizer gets game1's paths as the SAN tuples we already have
+    optimized_removed = optimize_variation_list(
+        to_remove_list, reference_game=game1, reference_variations=variations1
+    )
 
     # ==================== PHASE 2: ADD ====================
     # Create intermediate game1' by applying remove_variations to game1
-    game1_prime = _apply_remove_variations(game1, optimized_removed)
+    if optimized_removed:
+        game1_prime = _apply_remove_variations(game1, optimized_removed, max_depth)
 
-    # Extract variations from game1' (after removal)
-    variations1_prime = extract_all_variation_paths(game1_prime)
+        # Extract variations from game1' (after removal)
+        variations1_prime = _variation_paths(game1_prime)
+    else:
+        # Nothing removed: game1' is game1, no need to walk it again
+        game1_prime = game1
+        variations1_prime = variations1
 
     # Find variations to add: in game2 but NOT in game1'
-    to_add = variations2 - variations1_prime
-    to_add_list = sorted(list(to_add))
+    to_add_list = [_format_move_sequence(path) for path in variations2 - variations1_prime]
 
     # Optimize add_variations against game1' (reduced structure)
-    optimized_added = optimize_variation_list(to_add_list, reference_game=game1_prime)
-
-    # Get game names from headers
-    game1_name = game1.headers.get("White", f"Game {game1_index}")
-    game2_name = game2.headers.get("White", f"Game {game2_index}")
+    optimized_added = optimize_variation_list(
+        to_add_list, reference_game=game1_prime, reference_variations=variations1_prime
+    )
 
     return ComparisonResult(
         game1_index=game1_index,
@@ -213,10 +299,27 @@ def compare_pgn_files(
     Returns:
         List of ComparisonResult objects (one per game pair compared)
     """
-    # Parse both PGN files
-    games1 = parse_pgn(pgn1_path)
-    games2 = parse_pgn(pgn2_path)
+    return list(
+        iter_compare_pgn_files(pgn1_path, pgn2_path, game1_idx, game2_idx, color, depth)
+    )
+
 
+def iter_compare_pgn_files(
+    pgn1_path: str,
+    pgn2_path: str,
+    game1_idx: int = None,
+    game2_idx: int = None,
+    color: str = None,
+    depth: int = 10
+) -> Iterator[ComparisonResult]:
+    """
+    Compare games from two PGN files, yielding results as they are ready.
+
+    Takes the same arguments as compare_pgn_files.
+
+    Yields:
+        ComparisonResult objects in game index order
+    """
     # Calculate max_depth based on color
     max_depth = None
     if color:
@@ -225,43 +328,69 @@ def compare_pgn_files(
         else:  # black
             max_depth = 2 * depth
 
-    results = []
-
     if game1_idx is not None and game2_idx is not None:
         # Compare specific games
-        if game1_idx < 1 or game1_idx > len(games1):
+        # Index headers only and parse just the two requested games
+        offsets1 = index_pgn(pgn1_path)
+        offsets2 = index_pgn(pgn2_path)
+
+        if game1_idx < 1 or game1_idx > len(offsets1):
             raise ValueError(
                 f"Game index {game1_idx} out of range in {pgn1_path} "
-                f"(has {len(games1)} games)"
+                f"(has {len(offsets1)} games)"
             )
-        if game2_idx < 1 or game2_idx > len(games2):
+        if game2_idx < 1 or game2_idx > len(offsets2):
             raise ValueError(
                 f"Game index {game2_idx} out of range in {pgn2_path} "
-                f"(has {len(games2)} games)"
+                f"(has {len(offsets2)} games)"
             )
 
-        result = compare_games(
-            games1[game1_idx - 1],
-            games2[game2_idx - 1],
+        yield compare_games(
+            read_game_at(pgn1_path, offsets1[game1_idx - 1]),
+            read_game_at(pgn2_path, offsets2[game2_idx - 1]),
             game1_idx,
             game2_idx,
             max_depth
         )
-        results.append(result)
-    else:
-        # Compare all games by index (1 vs 1, 2 vs 2, etc.)
-        num_games = min(len(games1), len(games2))
-
-        for i in range(num_games):
-            result = compare_games(
-                games1[i],
-                games2[i],
-                i + 1,  # 1-based index
-                i + 1,  # 1-based index
-                max_depth
-            )
+        return
+
+    # Compare all games by index (1 vs 1, 2 vs 2, etc.)
+    # Only offsets are collected here; each pair is parsed where it is compared
+    offsets1 = index_pgn(pgn1_path)
+    offsets2 = index_pgn(pgn2_path)
+    num_games = min(len(offsets1), len(offsets2))
+
+    jobs = [
+        (pgn1_path, offsets1[i], pgn2_path, offsets2[i], i + 1, max_depth)
+        for i in range(num_games)
+    ]
+
+    if num_games < MIN_PARALLEL_GAMES or (os.cpu_count() or 1) < 2:
+        for result in map(_compare_games_worker, jobs):
             # Only include games with differences
             if result.has_differences():
-                results.append(result)
+                yield result
+    else:
+        # Game pairs are independent and CPU-bound, so use all cores
+        with ProcessPoolExecutor() as executor:
+            for result in executor.map(_compare_games_worker, jobs):
+                # Only include games with differences
+                if result.has_differences():
+                    yield result
+
+
+def _compare_games_worker(job: tuple) -> ComparisonResult:
+    """
+    Parse and compare one game pair (runs in a worker process).
 
-    return results
+    Args:
+        job: Tuple of (pgn1_path, offset1, pgn2_path, offset2, index, max_depth)
+            with offsets from index_pgn and a 1-based game index
+
+    Returns:
+        ComparisonResult for the pair
+    """
+    pgn1_path, offset1, pgn2_path, offset2, index, max_depth = job
+    game1 = read_game_at(pgn1_path, offset1)
+    game2 = read_game_at(pgn2_path, offset2)
+    return compare_games(game1, game2, index, index, max_depth)
@@ -6,7 +6,12 @@ from typing import Dict, Any, List
 from pydantic import ValidationError
 
 from .models import Config, ColorConfig, Game
-from .utils import parse_range_string
+
+# Prefer the libyaml-backed loader when PyYAML was built with it
+try:
+    from yaml import CSafeLoader as _SafeLoader
+except ImportError:
+    from yaml import SafeLoader as _SafeLoader
 
 
 def load_config(config_path: str) -> Config:
@@ -26,39 +31,55 @@ def load_config(config_path: str) -> Config:
     """
     config_file = Path(config_path)
 
-    if not config_file.exists():
-        raise FileNotFoundError(f"Config file not found: {config_path}")
+    config_data = _parse_config_data(config_file, config_path)
+    config = _validate_config(config_data, config_path)
+
+    # Expand shorthand syntax (skip/include) for each color config
+    for color_config in config.configs:
+        expand_shorthand_for_color(color_config)
 
+    return config
+
+
+def _parse_config_data(config_file: Path, config_path: str) -> Any:
+    """Parse the YAML of a config file into plain data."""
     # Load YAML
-    with open(config_file, "r") as f:
-        try:
-            config_data = yaml.safe_load(f)
-        except yaml.YAMLError as e:
-            raise ValueError(f"Invalid YAML syntax in {config_path}:\n{e}")
+    try:
+        text = config_file.read_text(encoding="utf-8")
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Config file not found: {config_path}")
+
+    try:
+        config_data = yaml.load(text, Loader=_SafeLoader)
+    except yaml.YAMLError as e:
+        raise ValueError(f"Invalid YAML syntax in {config_path}:\n{e}")
 
     if config_data is None:
         raise ValueError(f"Config file is empty: {config_path}")
 
+    return config_data
+
+
+def _validate_config(config_data: Any, config_path: str) -> Config:
+    """Validate parsed config data into a Config (before shorthand expansion)."""
     # Validate with Pydantic
     try:
-        config = Config(**config_data)
+        config = Config.model_validate(config_data)
     except ValidationError as e:
         raise ValueError(
             f"Config validation failed for {config_path}:\n{format_validation_error(e)}"
         )
 
-    # Expand shorthand syntax (skip/include) for each color config
-    for color_config in config.configs:
-        expand_shorthand_for_color(color_config)
-
     return config
 
 
 def expand_shorthand_for_color(color_config: ColorConfig) -> None:
     """
-    Expand shorthand 'skip' or 'include' fields into full games list for a color config.
-    Can be mixed with detailed games list for per-game control.
-    Modifies the color_config in place.
+    Prepare a color config for shorthand expansion at build time.
+
+    The 'skip'/'include' ranges are parsed during model validation; this
+    converts any detailed games list to 0-based indices so the builder can
+    merge it with the shorthand. Modifies the color_config in place.
 
     Args:
         color_config: ColorConfig object (may have skip/include fields)
@@ -68,29 +89,6 @@ def expand_shorthand_for_color(color_config: ColorConfig) -> None:
         for game in color_config.games:
             game.index = game.index - 1  # Convert to 0-based
 
-    # If only games list (no shorthand), we're done
-    if color_config.games and not color_config.skip and not color_config.include:
-        return
-
-    # Parse shorthand ranges and store for later expansion
-    if color_config.skip:
-        try:
-            skip_indices = parse_range_string(color_config.skip)
-            # Store as metadata for later expansion (keep as 1-based for now)
-            color_config._skip_indices = skip_indices
-            color_config._use_skip = True
-        except ValueError as e:
-            raise ValueError(f"Color '{color_config.color}': Invalid 'skip' syntax: {e}")
-
-    if color_config.include:
-        try:
-            include_indices = parse_range_string(color_config.include)
-            # Store as metadata for later expansion (keep as 1-based for now)
-            color_config._include_indices = include_indices
-            color_config._use_include = True
-        except ValueError as e:
-            raise ValueError(f"Color '{color_config.color}': Invalid 'include' syntax: {e}")
-
 
 def format_validation_error(error: ValidationError) -> str:
     """
@@ -102,13 +100,10 @@ def format_validation_error(error: ValidationError) -> str:
     Returns:
         Formatted error message
     """
-    lines = []
-    for err in error.errors():
-        location = " -> ".join(str(loc) for loc in err["loc"])
-        message = err["msg"]
-        lines.append(f"  {location}: {message}")
-
-    return "\n".join(lines)
+    return "\n".join(
+        f"  {' -> '.join(str(loc) for loc in err['loc'])}: {err['msg']}"
+        for err in error.errors()
+    )
 
 
 def validate_config_file(config_path: str) -> tuple[bool, str]:
@@ -3,15 +3,30 @@
 import re
 import chess
 import chess.pgn
-from typing import List, Dict, Tuple
+from itertools import chain
+from pathlib import Path
+from typing import Iterator, List, Dict, Optional, Tuple
 from rich.console import Console
 from rich.table import Table
 
-from .pgn_processor import parse_pgn, count_variations, get_average_depth
+from .pgn_processor import index_pgn, iter_pgn, read_game_at
+from .utils import pickle_cache_file, read_pickle_cache, write_pickle_cache
 
 
 console = Console()
 
+# Per-game summary stats are cached on disk, keyed by file path, mtime and size
+STATS_CACHE_DIR = Path.home() / ".pgnc" / "stats_cache"
+STATS_CACHE_MAX_ENTRIES = 32
+# Below this size walking the games is cheaper than a cache lookup
+STATS_CACHE_MIN_SIZE = 16 * 1024
+# Stored with every entry; bump when GameSummary changes
+STATS_CACHE_FORMAT = 2
+
+# (White, ECO, Annotator, variations, average depth, max depth) for one game;
+# header values are None when the tag is missing
+GameSummary = Tuple[Optional[str], Optional[str], Optional[str], int, float, int]
+
 
 def inspect_pgn(pgn_path: str, game_index: int = None, list_variations: bool = False):
     """
@@ -24,78 +39,94 @@ def inspect_pgn(pgn_path: str, game_index: int = None, list_variations: bool = F
     """
     console.print(f"\n[cyan]File:[/cyan] {pgn_path}\n")
 
-    # Parse PGN
-    games = parse_pgn(pgn_path)
-
-    if not games:
-        console.print("[yellow]No games found in PGN file[/yellow]")
-        return
-
     # Show specific game details
     if game_index is not None:
-        if game_index < 1 or game_index > len(games):
+        # Index headers only and parse just the requested game
+        offsets = index_pgn(pgn_path)
+
+        if not offsets:
+            console.print("[yellow]No games found in PGN file[/yellow]")
+            return
+
+        if game_index < 1 or game_index > len(offsets):
             console.print(
                 f"[red]Error:[/red] Game index {game_index} out of range "
-                f"(file has {len(games)} games, indices 1-{len(games)})"
+                f"(file has {len(offsets)} games, indices 1-{len(offsets)})"
             )
             return
 
         # Convert 1-based to 0-based for internal use
-        _inspect_single_game(games[game_index - 1], game_index - 1, list_variations)
+        game = read_game_at(pgn_path, offsets[game_index - 1])
+        _inspect_single_game(game, game_index - 1, list_variations)
         return
 
     # Show summary of all games
     if list_variations:
+        # Stream games instead of holding the whole file in memory
+        games = iter_pgn(pgn_path)
+        first_game = next(games, None)
+
+        if first_game is None:
+            console.print("[yellow]No games found in PGN file[/yellow]")
+            return
+
         # If list_variations is True, show variations for all games
-        for i, game in enumerate(games, 1):
-            _inspect_single_game(game, i - 1, list_variations=True)
-            if i < len(games):
+        for i, game in enumerate(chain([first_game], games)):
+            if i > 0:
                 console.print()  # Add spacing between games
-    else:
-        _inspect_all_games(games)
+            _inspect_single_game(game, i, list_variations=True)
+        return
+
+    summaries = load_game_summaries(pgn_path)
 
+    if not summaries:
+        console.print("[yellow]No games found in PGN file[/yellow]")
+        return
 
-def _inspect_all_games(games: List[chess.pgn.Game]):
+    _inspect_all_games(summaries)
+
+
+def _inspect_all_games(summaries: List[GameSummary]):
     """Display summary of all games in PGN."""
 
+    game_count = 0
     total_variations = 0
     total_depth = 0.0
     max_depth_overall = 0
 
     console.print(f"[bold]Games:[/bold]\n")
 
-    for i, game in enumerate(games):
-        variations = count_variations(game)
-        avg_depth = get_average_depth(game)
-        max_depth = _get_max_depth(game)
-
+    for i, (white, eco, annotator, variations, avg_depth, max_depth) in enumerate(summaries):
+        game_count += 1
         total_variations += variations
         total_depth += avg_depth
-        max_depth_overall = max(max_depth_overall, max_depth)
-
-        # Extract game info
-        white = game.headers.get("White", "?")
-        eco = game.headers.get("ECO", "?")
-        annotator = game.headers.get("Annotator", "?")
-
-        # Display game summary
-        console.print(f"  [bold cyan][{i + 1}][/bold cyan] {white}")
-        console.print(f"      Variations: {variations}")
-        console.print(
-            f"      Avg Depth: {avg_depth:.1f} moves, Max Depth: {max_depth} moves"
-        )
-        console.print(f"      ECO: {eco}")
+        if max_depth > max_depth_overall:
+            max_depth_overall = max_depth
+
+        # Fill in missing headers
+        white = "?" if white is None else white
+        eco = "?" if eco is None else eco
+        annotator = "?" if annotator is None else annotator
+
+        # Display game summary (one print per game)
+        lines = [
+            f"  [bold cyan][{i + 1}][/bold cyan] {white}",
+            f"      Variations: {variations}",
+            f"      Avg Depth: {avg_depth:.1f} moves, Max Depth: {max_depth} moves",
+            f"      ECO: {eco}",
+        ]
         if annotator != "?":
-            console.print(f"      Annotator: {annotator}")
-        console.print()
+            lines.append(f"      Annotator: {annotator}")
+        lines.append("")
+        console.print("\n".join(lines))
 
     # Overall statistics
     console.print(
-        f"[bold]Total:[/bold] {len(games)} game(s), {total_variations} variations"
+        f"[bold]Total:[/bold] {game_count} game(s), {total_variations} variations"
     )
-    if len(games) > 0:
-        avg_variations = total_variations / len(games)
-        avg_depth_overall = total_depth / len(games)
+    if game_count > 0:
+        avg_variations = total_variations / game_count
+        avg_depth_overall = total_depth / game_count
         console.print(
             f"[bold]Average:[/bold] {avg_variations:.0f} variations per game, "
             f"{avg_depth_overall:.1f} moves depth"
@@ -119,9 +150,7 @@ def _inspect_single_game(game: chess.pgn.Game, index: int, list_variations: bool
     console.print()
 
     # Statistics
-    variations = count_variations(game)
-    avg_depth = get_average_depth(game)
-    max_depth = _get_max_depth(game)
+    variations, avg_depth, max_depth = _get_game_stats(game)
 
     console.print(f"[bold]Variations:[/bold] {variations}")
     console.print(f"[bold]Average Depth:[/bold] {avg_depth:.1f} moves")
@@ -138,9 +167,8 @@ def _inspect_single_game(game: chess.pgn.Game, index: int, list_variations: bool
     # List all variations if requested
     if list_variations:
         console.print("[bold]All Variations:[/bold]")
-        variations_list = _extract_all_variations(game)
-
-        for i, (moves_san, depth) in enumerate(variations_list, 1):
+        # Print each variation as the walk reaches it
+        for i, (moves_san, depth) in enumerate(_iter_all_variations(game), 1):
             # Color the variation index and move numbers differently
             colored_moves = _color_move_sequence(moves_san)
             console.print(
@@ -148,18 +176,62 @@ def _inspect_single_game(game: chess.pgn.Game, index: int, list_variations: bool
             )
 
 
-def _get_max_depth(game: chess.pgn.Game) -> int:
-    """Get maximum depth of any variation in the game."""
+def load_game_summaries(pgn_path: str) -> List[GameSummary]:
+    """
+    Get summary stats for every game in a PGN file.
+
+    Results are cached under ~/.pgnc/stats_cache, so running inspect and
+    init on an unchanged file walks its games only once.
+
+    Args:
+        pgn_path: Path to PGN file
+
+    Returns:
+        List of (White, ECO, Annotator, variations, avg depth, max depth)
+        tuples, one per game in file order
+    """
+    cache_file = pickle_cache_file(STATS_CACHE_DIR, Path(pgn_path), STATS_CACHE_MIN_SIZE)
+    summaries = read_pickle_cache(cache_file, STATS_CACHE_FORMAT) if cache_file else None
+    if summaries is None:
+        summaries = []
+        for game in iter_pgn(pgn_path):
+            headers = game.headers
+            summaries.append(
+                (headers.get("White"), headers.get("ECO"), headers.get("Annotator"))
+                + _get_game_stats(game)
+            )
+        if cache_file:
+            write_pickle_cache(
+                cache_file, summaries, STATS_CACHE_FORMAT, STATS_CACHE_MAX_ENTRIES
+            )
+
+    return summaries
+
+
+def _get_game_stats(game: chess.pgn.Game) -> Tuple[int, float, int]:
+    """
+    Count variations and get their average and maximum depth in one pass.
+
+    Returns:
+        Tuple of (number of variations, average depth, maximum depth)
+    """
+    leaf_count = 0
+    total_depth = 0
     max_depth = 0
+    stack = [(game, 0)]
 
-    def traverse(node, depth=0):
-        nonlocal max_depth
-        max_depth = max(max_depth, depth)
-        for variation in node.variations:
-            traverse(variation, depth + 1)
+    while stack:
+        node, depth = stack.pop()
+        if node.variations:
+            stack.extend((variation, depth + 1) for variation in node.variations)
+        else:
+            # Leaf node - this is a complete variation
+            leaf_count += 1
+            total_depth += depth
+            if depth > max_depth:
+                max_depth = depth
 
-    traverse(game)
-    return max_depth
+    return leaf_count, total_depth / leaf_count, max_depth
 
 
 def _get_first_moves(game: chess.pgn.Game, limit: int = 10) -> str:
@@ -187,8 +259,7 @@ def _get_first_moves(game: chess.pgn.Game, limit: int = 10) -> str:
         
         # Continue along the main line
         node = node.variation(0)
-        moves.append(board.san(node.move))
-        board.push(node.move)
+        moves.append(board.san_and_push(node.move))
         
         # Check if current node (after the move) has multiple variations (branching point)
         if len(node.variations) > 1:
@@ -207,33 +278,43 @@ def _get_first_moves(game: chess.pgn.Game, limit: int = 10) -> str:
     return " ".join(formatted)
 
 
-def _extract_all_variations(game: chess.pgn.Game) -> List[Tuple[str, int]]:
+def _iter_all_variations(game: chess.pgn.Game) -> Iterator[Tuple[str, int]]:
     """
-    Extract all variations as move sequences in PGN format.
+    Yield all variations as move sequences in PGN format.
 
-    Returns:
-        List of (move_sequence, depth) tuples with moves formatted as "1.e4 e5 2.Nf3"
+    Yields:
+        (move_sequence, depth) tuples with moves formatted as "1.e4 e5 2.Nf3"
     """
-    variations = []
+    if not game.variations:
+        yield _format_move_sequence([]), 0
+        return
 
-    def traverse(node, board, moves_san=[], depth=0):
-        if not node.variations:
+    # Iterative DFS over a single board: push moves on the way down and
+    # pop them on backtrack instead of copying the board at every node
+    board = game.board()
+    moves_san = []
+    stack = [iter(game.variations)]
+
+    while stack:
+        variation = next(stack[-1], None)
+        if variation is None:
+            # All children visited - backtrack
+            stack.pop()
+            if moves_san:
+                board.pop()
+                moves_san.pop()
+            continue
+
+        moves_san.append(board.san_and_push(variation.move))
+
+        if variation.variations:
+            stack.append(iter(variation.variations))
+        else:
             # Leaf node - this is a complete variation
             # Format moves with move numbers (like "1.e4 e5 2.Nf3")
-            formatted = _format_move_sequence(moves_san)
-            variations.append((formatted, depth))
-            return
-
-        for variation in node.variations:
-            new_board = board.copy()
-            move_san = new_board.san(variation.move)
-            new_board.push(variation.move)
-
-            traverse(variation, new_board, moves_san + [move_san], depth + 1)
-
-    traverse(game, game.board())
-
-    return variations
+            yield _format_move_sequence(moves_san), len(moves_san)
+            board.pop()
+            moves_san.pop()
 
 
 def _format_move_sequence(moves_san: List[str]) -> str:
@@ -293,21 +374,25 @@ def generate_starter_config(pgn_path: str, output_path: str = None):
         output_path: Path for output config (default: <pgn_name>_config.yaml)
     """
     import yaml
-    from pathlib import Path
+
+    # Prefer the libyaml-backed dumper when PyYAML was built with it
+    try:
+        from yaml import CSafeDumper as SafeDumper
+    except ImportError:
+        from yaml import SafeDumper
+
+    pgn_file = Path(pgn_path)
+    pgn_name = pgn_file.stem
 
     if output_path is None:
-        pgn_name = Path(pgn_path).stem
         output_path = f"{pgn_name}_config.yaml"
 
-    # Parse PGN
-    games = parse_pgn(pgn_path)
-
     # Build config structure
     config = {
-        "name": f"Repertoire from {Path(pgn_path).name}",
+        "name": f"Repertoire from {pgn_file.name}",
         "description": "Auto-generated starter config - edit as needed",
         "source": pgn_path,
-        "output": f"{Path(pgn_path).stem}_curated",  # Output prefix
+        "output": f"{pgn_name}_curated",  # Output prefix
         "configs": [
             {
                 "color": "white",  # or "black"
@@ -320,28 +405,39 @@ def generate_starter_config(pgn_path: str, output_path: str = None):
         ],
     }
 
-    # Add all games with include action to the first color config
-    for i, game in enumerate(games):
-        white = game.headers.get("White", f"Game {i + 1}")
-        variations = count_variations(game)
+    dump_options = dict(Dumper=SafeDumper, default_flow_style=False, sort_keys=False)
+    summaries = load_game_summaries(pgn_path)
 
-        config["configs"][0]["games"].append(
-            {
+    # Write config, streaming game entries instead of building the full list
+    with Path(output_path).open("w") as f:
+        top_matter = yaml.dump(config, **dump_options)
+        if summaries:
+            # "games" is the last key and dumps as "games: []" - open the
+            # block list instead and append the entries below it
+            f.write(top_matter[: -len(" []\n")] + "\n")
+        else:
+            f.write(top_matter)
+
+        # Add all games with include action to the first color config
+        for i, (white, _, _, variations, _, _) in enumerate(summaries):
+            if white is None:
+                white = f"Game {i + 1}"
+
+            entry = {
                 "index": i + 1,  # 1-based indexing
                 "action": "include",
                 "name": f"{white} ({variations} variations)",
             }
-        )
-
-    # Write config
-    with open(output_path, "w") as f:
-        yaml.dump(config, f, default_flow_style=False, sort_keys=False)
+            # Dump inside the same nesting as the full config so indentation
+            # and line wrapping match, then drop the "- games:" line
+            block = yaml.dump([{"games": [entry]}], **dump_options)
+            f.write(block[block.index("\n") + 1 :])
 
     console.print(f"[green]✓[/green] Generated starter config: {output_path}")
     console.print(f"\nEdit this file to:")
     console.print("  - Change color to 'white' or 'black'")
     console.print("  - Change actions to 'skip' or 'skip_keep_headers'")
-    console.print("  - Add skip_variations or keep_variations")
+    console.print("  - Add remove_variations or add_variations")
     console.print("  - Adjust max_depth per game (optional, in half-moves)")
     console.print(f"\nThen run: pgnc build {output_path}")
-    console.print("         or: pgnc build {output_path} --depth 10")
+    console.print(f"         or: pgnc build {output_path} --depth 10")
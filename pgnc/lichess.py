@@ -1,20 +1,66 @@
 """Lichess API integration for uploading studies."""
 
+import hashlib
+import io
+import json
 import os
-from typing import Optional, Dict
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, List, Tuple
 from pathlib import Path
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from rich.console import Console
-from rich.prompt import Prompt
 
-from .pgn_processor import parse_pgn
+# python-chess (via chess.pgn and pgn_processor) is imported inside
+# upload_pgn_to_study, so using LichessClient or the token helpers on
+# their own does not load it.
 
 console = Console()
 
 # Lichess API endpoints
 LICHESS_API_BASE = "https://lichess.org/api"
 
+# Local token storage
+TOKEN_DIR = Path.home() / ".pgnc"
+TOKEN_FILE = str(TOKEN_DIR / "lichess_token")
+# Last successful token check (holds a fingerprint, never the token)
+ACCOUNT_FILE = TOKEN_DIR / "lichess_account.json"
+
+# Retry transient failures, honouring Lichess's Retry-After on 429
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# Concurrent chapter uploads (kept small to respect Lichess rate limits)
+UPLOAD_WORKERS = 4
+
+# A token verified against /account within this many seconds is trusted
+# without asking Lichess again
+TOKEN_VERIFY_TTL = 24 * 60 * 60
+
+
+class _RateLimitRetry(Retry):
+    """
+    Retry policy that also retries POST requests, but only when rate limited.
+
+    A 429 means Lichess did not process the request, so resending it cannot
+    import a chapter twice; a POST that failed any other way is not resent.
+    """
+
+    def is_retry(self, method: str, status_code: int, has_retry_after: bool = False) -> bool:
+        if method and method.upper() == "POST" and status_code != 429:
+            return False
+        return super().is_retry(method, status_code, has_retry_after)
+
+
+class AuthenticationError(ValueError):
+    """Raised when Lichess rejects the API token."""
+
+
+class ImportRejectedError(ValueError):
+    """Raised when Lichess rejects an import request without processing it."""
+
 
 class LichessClient:
     """Client for interacting with Lichess API."""
@@ -28,6 +74,28 @@ class LichessClient:
         """
         self.access_token = api_token
         self.base_url = LICHESS_API_BASE
+        self._account: Optional[Dict] = None
+
+        # One session for all requests so the TLS connection is reused
+        self.session = requests.Session()
+        self.session.headers.update(self._get_headers())
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=8,
+            max_retries=_RateLimitRetry(
+                total=5,
+                # A read error may come after Lichess accepted a POST
+                read=0,
+                backoff_factor=1.0,
+                status_forcelist=RETRY_STATUS_CODES,
+                allowed_methods=Retry.DEFAULT_ALLOWED_METHODS | {"POST"},
+                respect_retry_after_header=True,
+                # Hand the last 429/5xx response back once retries run out,
+                # so its status is reported like any other failed request
+                raise_on_status=False,
+            ),
+        )
+        self.session.mount("https://", adapter)
 
     def _get_headers(self) -> Dict[str, str]:
         """Get HTTP headers with authentication."""
@@ -41,34 +109,43 @@ class LichessClient:
         Make authenticated API request.
         
         Raises:
-            requests.HTTPError: If API request fails
-            ValueError: If not authenticated
+            ValueError: If not authenticated or the API request fails
         """
         if not self.access_token:
             raise ValueError("Not authenticated. Please run 'pgnc upload --auth' first.")
             
         url = f"{self.base_url}/{endpoint.lstrip('/')}"
-        headers = self._get_headers()
-        headers.update(kwargs.pop("headers", {}))
+        headers = kwargs.pop("headers", {})
 
         try:
-            response = requests.request(method, url, headers=headers, **kwargs)
-            response.raise_for_status()
-            return response
-        except requests.HTTPError as e:
-            # Try to get error message from response
-            try:
-                error_data = response.json()
-                error_msg = error_data.get("error", {}).get("message", str(e))
-            except:
-                error_msg = str(e)
-            raise ValueError(f"Lichess API error: {error_msg}") from e
+            response = self.session.request(method, url, headers=headers, **kwargs)
         except requests.RequestException as e:
             raise ValueError(f"Network error: {str(e)}") from e
 
+        # Check the status directly; the body is only parsed for errors
+        if not response.ok:
+            error_msg = _extract_error_message(response)
+            if response.status_code == 401:
+                raise AuthenticationError(f"Lichess API error: {error_msg}")
+            raise ValueError(f"Lichess API error: {error_msg}")
+
+        return response
+
     def get_account(self) -> Dict:
-        """Get account information."""
-        return self._request("GET", "/account").json()
+        """Get account information (fetched once per client)."""
+        if self._account is None:
+            self._account = self._request("GET", "/account").json()
+        return self._account
+
+    def close(self):
+        """Close the HTTP session and release pooled connections."""
+        self.session.close()
+
+    def __enter__(self) -> "LichessClient":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
 
 
     def import_pgn_to_study(self, study_id: str, pgn: str) -> Dict:
@@ -83,7 +160,10 @@ class LichessClient:
             Response data from import
 
         Raises:
-            ValueError: If import fails
+            AuthenticationError: If Lichess rejects the token
+            ImportRejectedError: If Lichess rejects the request (4xx), so
+                nothing was imported
+            ValueError: If import fails in any other way
         """
         # Lichess API endpoint: POST /api/study/{study_id}/import-pgn
         # Uses form-encoded data with 'pgn' parameter (URL-encoded)
@@ -93,37 +173,117 @@ class LichessClient:
         # requests library will handle URL encoding automatically
         data = {"pgn": pgn}
         
-        # Get headers but override Content-Type for form data
-        headers = self._get_headers()
-        headers["Content-Type"] = "application/x-www-form-urlencoded"
+        # Override Content-Type for form data (session supplies auth headers)
+        headers = {"Content-Type": "application/x-www-form-urlencoded"}
         
         try:
             url = f"{self.base_url}/{endpoint.lstrip('/')}"
-            response = requests.post(url, headers=headers, data=data)
-            response.raise_for_status()
-            
-            # Try to parse JSON response, return empty dict if no content
-            if response.content:
-                try:
-                    return response.json()
-                except:
-                    return {"status": "success", "content": response.text}
-            return {}
-        except requests.HTTPError as e:
-            # Try to get error message from response
-            try:
-                error_data = response.json()
-                error_msg = error_data.get("error", {}).get("message", str(e))
-            except:
-                error_msg = str(e)
-            raise ValueError(
-                f"Failed to import PGN to study {study_id}: {error_msg}"
-            ) from e
+            response = self.session.post(url, headers=headers, data=data)
         except requests.RequestException as e:
             raise ValueError(
                 f"Network error importing PGN: {str(e)}"
             ) from e
 
+        if not response.ok:
+            error_msg = _extract_error_message(response)
+            if response.status_code == 401:
+                error_cls = AuthenticationError
+            elif response.status_code < 500:
+                error_cls = ImportRejectedError
+            else:
+                error_cls = ValueError
+            raise error_cls(
+                f"Failed to import PGN to study {study_id}: {error_msg}"
+            )
+
+        # Try to parse JSON response, return empty dict if no content
+        if response.content:
+            try:
+                return response.json()
+            except ValueError:
+                return {"status": "success", "content": response.text}
+        return {}
+
+
+def _extract_error_message(response: requests.Response) -> str:
+    """
+    Get the error message from a Lichess error response.
+
+    The body is parsed once; when it has no structured error the message
+    falls back to the status line, as raise_for_status would report it.
+
+    Args:
+        response: Failed HTTP response
+
+    Returns:
+        Error message from the JSON body, or the HTTP status description
+    """
+    kind = "Client" if response.status_code < 500 else "Server"
+    default = (
+        f"{response.status_code} {kind} Error: {response.reason} "
+        f"for url: {response.url}"
+    )
+    try:
+        return response.json().get("error", {}).get("message", default)
+    except (ValueError, AttributeError):
+        return default
+
+
+def _upload_chapters(
+    client: LichessClient,
+    study_id: str,
+    exports: List[Tuple[int, str, str]],
+    max_workers: int,
+) -> List[Dict]:
+    """
+    Import games into a study one chapter per request.
+
+    Args:
+        client: Authenticated Lichess client
+        study_id: Lichess study ID
+        exports: (1-based index, chapter name, PGN string) for each game
+        max_workers: Number of chapters uploaded concurrently (1 keeps file order)
+
+    Returns:
+        List of {"name", "result"} dicts for the chapters that were uploaded,
+        in file order
+
+    Raises:
+        AuthenticationError: If Lichess rejects the token; chapters not yet
+            started are cancelled
+    """
+    chapters = []
+
+    # Requests are network-bound, so overlap them on a small thread pool
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = [
+            (executor.submit(client.import_pgn_to_study, study_id, pgn_string), i, game_name)
+            for i, game_name, pgn_string in exports
+        ]
+
+        # Report progress in file order, waiting on each upload in turn
+        for future, i, game_name in futures:
+            console.print(f"  [{i}/{len(exports)}] {game_name}")
+
+            try:
+                result = future.result()
+                chapters.append({"name": game_name, "result": result})
+                console.print(f"    [green]✓[/green] Uploaded: {game_name}")
+            except AuthenticationError:
+                # Every other chapter would fail the same way: stop here
+                for pending, _, _ in futures:
+                    pending.cancel()
+                raise
+            except ValueError as e:
+                console.print(f"    [red]✗[/red] Failed: {e}")
+                # Continue with other chapters even if one fails
+                continue
+            except Exception as e:
+                console.print(f"    [red]✗[/red] Unexpected error: {e}")
+                continue
+
+    return chapters
+
 
 def save_token(token: str, token_file: Optional[str] = None):
     """
@@ -134,18 +294,37 @@ def save_token(token: str, token_file: Optional[str] = None):
         token_file: Path to token file (default: ~/.pgnc/lichess_token)
     """
     if token_file is None:
-        token_dir = Path.home() / ".pgnc"
-        token_dir.mkdir(exist_ok=True, mode=0o700)
-        token_file = str(token_dir / "lichess_token")
+        TOKEN_DIR.mkdir(exist_ok=True, mode=0o700)
+        token_file = TOKEN_FILE
 
-    with open(token_file, "w") as f:
-        f.write(token)
-
-    # Set restrictive permissions
-    os.chmod(token_file, 0o600)
+    _write_private_file(token_file, token.encode())
     console.print(f"[green]✓ Token saved to {token_file}[/green]")
 
 
+def _write_private_file(path: str, data: bytes):
+    """
+    Replace a file with data readable only by the current user (mode 0600).
+
+    The data goes to a fresh temp file created with restrictive permissions
+    from the start, which is then swapped into place, so it is never
+    readable by others or half-written. A leftover temp file would keep its
+    own mode, so it is removed and a new one created exclusively.
+
+    Args:
+        path: File to write
+        data: Bytes to store
+    """
+    tmp_file = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.unlink(tmp_file)
+    except FileNotFoundError:
+        pass
+    fd = os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp_file, path)
+
+
 def load_token(token_file: Optional[str] = None) -> Optional[str]:
     """
     Load access token from file.
@@ -157,15 +336,66 @@ def load_token(token_file: Optional[str] = None) -> Optional[str]:
         Access token or None if not found
     """
     if token_file is None:
-        token_file = str(Path.home() / ".pgnc" / "lichess_token")
+        token_file = TOKEN_FILE
 
-    if not os.path.exists(token_file):
+    try:
+        with open(token_file, "r") as f:
+            # Remove any trailing newlines or whitespace
+            return f.read().strip() or None
+    except FileNotFoundError:
         return None
 
-    with open(token_file, "r") as f:
-        token = f.read().strip()
-        # Remove any trailing newlines or whitespace
-        return token.strip()
+
+def _token_fingerprint(token: str) -> str:
+    """Hash of a token, so the verification record never stores it."""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def load_verified_account(token: str) -> Optional[Dict]:
+    """
+    Get cached account info for a token verified within TOKEN_VERIFY_TTL.
+
+    Args:
+        token: API token about to be used
+
+    Returns:
+        Account info ({"username": ...}) or None if the token must be checked
+    """
+    try:
+        with open(ACCOUNT_FILE, "r") as f:
+            record = json.load(f)
+        if record["token"] != _token_fingerprint(token):
+            return None
+        if time.time() - record["verified_at"] > TOKEN_VERIFY_TTL:
+            return None
+        return {"username": record["username"]}
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def save_verified_account(token: str, account: Optional[Dict]):
+    """
+    Record that a token was verified, or forget the record if account is None.
+
+    Args:
+        token: API token that was checked
+        account: Account info returned by Lichess, or None to invalidate
+    """
+    try:
+        if account is None:
+            ACCOUNT_FILE.unlink()
+            return
+
+        TOKEN_DIR.mkdir(exist_ok=True, mode=0o700)
+        record = {
+            "token": _token_fingerprint(token),
+            "username": account.get("username", "user"),
+            "verified_at": time.time(),
+        }
+        _write_private_file(str(ACCOUNT_FILE), json.dumps(record).encode())
+    except OSError:
+        # The record is only an optimization
+        pass
 
 
 def upload_pgn_to_study(
@@ -174,6 +404,8 @@ def upload_pgn_to_study(
     api_token: Optional[str] = None,
     visibility: str = "public",
     study_id: Optional[str] = None,
+    max_workers: Optional[int] = None,
+    verify: bool = False,
 ) -> Dict:
     """
     Upload PGN file to Lichess study using import-pgn endpoint.
@@ -184,14 +416,29 @@ def upload_pgn_to_study(
         api_token: Personal API token from lichess.org/account/oauth/token/create
         visibility: "public" or "private" (not used - study must exist)
         study_id: Existing study ID (REQUIRED - study must be created manually on lichess.org)
+        max_workers: Number of chapters uploaded concurrently when falling
+            back to one request per chapter (1 keeps file order; default:
+            UPLOAD_WORKERS)
+        verify: Always check the token against /account first, even if it
+            was verified recently
 
     Returns:
         Study information with ID and URL
 
     Note:
         Study must exist on lichess.org (create manually first).
-        Each game in the PGN file will be imported as a chapter.
+        Each game in the PGN file will be imported as a chapter. All games
+        are sent in a single import request; if Lichess rejects it (4xx),
+        each chapter is uploaded separately. Other failures are raised, as
+        some chapters may already have been created. Lichess appends chapters as imports
+        arrive, so with max_workers > 1 the fallback may not keep file order.
     """
+    from chess.pgn import FileExporter
+    from .pgn_processor import index_pgn, iter_pgn
+
+    if max_workers is None:
+        max_workers = UPLOAD_WORKERS
+
     # Load token if not provided
     if not api_token:
         api_token = load_token()
@@ -208,70 +455,114 @@ def upload_pgn_to_study(
             "and provide the study ID from the URL."
         )
 
-    # Initialize client
-    client = LichessClient(api_token=api_token)
-
-    # Verify authentication
-    try:
-        account = client.get_account()
+    # Initialize client; the session is closed once the uploads finish
+    with LichessClient(api_token=api_token) as client:
+        # Verify authentication, unless this token was checked recently; a
+        # token that has since been revoked fails on the import instead
+        account = None if verify else load_verified_account(api_token)
+        if account is None:
+            try:
+                account = client.get_account()
+            except Exception as e:
+                console.print(f"[red]✗ Authentication failed: {e}[/red]")
+                raise
+            save_verified_account(api_token, account)
         console.print(f"[green]✓ Authenticated as {account.get('username', 'user')}[/green]\n")
-    except Exception as e:
-        console.print(f"[red]✗ Authentication failed: {e}[/red]")
-        raise
 
-    # Validate PGN file
-    if not os.path.exists(pgn_path):
-        raise FileNotFoundError(f"PGN file not found: {pgn_path}")
-    
-    if not pgn_path.endswith(".pgn"):
-        raise ValueError(f"File must be a PGN file: {pgn_path}")
-
-    # Parse PGN file
-    console.print(f"[cyan]Reading PGN file: {pgn_path}[/cyan]")
-    try:
-        games = parse_pgn(pgn_path)
-    except Exception as e:
-        raise ValueError(f"Failed to parse PGN file: {str(e)}") from e
-
-    if not games:
-        raise ValueError(f"No games found in {pgn_path}")
-
-    # Use existing study (required - study must exist)
-    console.print(f"\n[cyan]Importing to existing study: {study_id}[/cyan]")
-    console.print("[dim]Note: Study must exist on lichess.org (create manually)[/dim]\n")
-
-    # Upload each game as a chapter
-    console.print(f"[cyan]Uploading {len(games)} game(s) as chapters...[/cyan]\n")
-    chapters = []
-
-    for i, game in enumerate(games, 1):
-        # Get game name from headers
-        game_name = (
-            game.headers.get("White", "")
-            + " vs "
-            + game.headers.get("Black", "")
-        )
-        if not game_name or game_name == " vs ":
-            game_name = f"Chapter {i}"
+        # Validate PGN file
+        if not os.path.isfile(pgn_path):
+            raise FileNotFoundError(f"PGN file not found: {pgn_path}")
 
-        console.print(f"  [{i}/{len(games)}] {game_name}")
-
-        # Convert game to PGN string
-        from chess.pgn import StringExporter
-        exporter = StringExporter(headers=True, variations=True, comments=True)
-        pgn_string = game.accept(exporter)
+        if not pgn_path.endswith(".pgn"):
+            raise ValueError(f"File must be a PGN file: {pgn_path}")
 
+        # Count games up front (headers only); games are parsed one at a time below
+        console.print(f"[cyan]Reading PGN file: {pgn_path}[/cyan]")
         try:
-            result = client.import_pgn_to_study(study_id, pgn_string)
-            chapters.append({"name": game_name, "result": result})
-            console.print(f"    [green]✓[/green] Uploaded: {game_name}")
-        except ValueError as e:
-            console.print(f"    [red]✗[/red] Failed: {e}")
-            # Continue with other chapters even if one fails
-            continue
+            game_count = len(index_pgn(pgn_path))
         except Exception as e:
-            console.print(f"    [red]✗[/red] Unexpected error: {e}")
-            continue
+            raise ValueError(f"Failed to parse PGN file: {str(e)}") from e
+
+        if not game_count:
+            raise ValueError(f"No games found in {pgn_path}")
+
+        # Use existing study (required - study must exist)
+        console.print(f"\n[cyan]Importing to existing study: {study_id}[/cyan]")
+        console.print("[dim]Note: Study must exist on lichess.org (create manually)[/dim]\n")
+
+        # Export every game into one buffer with a single exporter (it resets
+        # itself per game) so the file can go up in one request; each game's
+        # span is kept for the per-chapter fallback
+        buffer = io.StringIO()
+        exporter = FileExporter(buffer, headers=True, variations=True, comments=True)
+        spans = []
+        for i, game in enumerate(iter_pgn(pgn_path), 1):
+            # Get game name from headers
+            game_name = (
+                game.headers.get("White", "")
+                + " vs "
+                + game.headers.get("Black", "")
+            )
+            if not game_name or game_name == " vs ":
+                game_name = f"Chapter {i}"
+
+            start = buffer.tell()
+            game.accept(exporter)
+            spans.append((i, game_name, start, buffer.tell()))
+
+        # FileExporter ends every game with a blank line
+        pgn_text = buffer.getvalue()
+
+        # Upload each game as a chapter
+        console.print(f"[cyan]Uploading {game_count} game(s) as chapters...[/cyan]\n")
+        chapters = []
+
+        if len(spans) > 1:
+            # import-pgn creates one chapter per game in a multi-game body,
+            # so the whole file takes a single round trip
+            try:
+                result = client.import_pgn_to_study(study_id, pgn_text.rstrip("\n"))
+            except AuthenticationError:
+                # Retrying chapter by chapter cannot help with a bad token
+                save_verified_account(api_token, None)
+                raise
+            except ImportRejectedError as e:
+                # Rejected outright, so no chapter was created: retrying
+                # one game at a time cannot duplicate any
+                console.print(
+                    f"[yellow]Bulk import failed ({e}), "
+                    f"uploading chapters one by one[/yellow]\n"
+                )
+            except ValueError:
+                # A server error or lost connection may come after some
+                # chapters were created; re-uploading could duplicate them
+                console.print(
+                    "[yellow]Bulk import failed; some chapters may have been "
+                    "imported - check the study before uploading again[/yellow]"
+                )
+                raise
+            else:
+                for i, game_name, _, _ in spans:
+                    console.print(f"  [{i}/{game_count}] {game_name}")
+                    console.print(f"    [green]✓[/green] Uploaded: {game_name}")
+                    chapters.append({"name": game_name, "result": result})
+
+        if not chapters:
+            exports = [
+                (i, game_name, pgn_text[start:end].rstrip("\n"))
+                for i, game_name, start, end in spans
+            ]
+            try:
+                chapters = _upload_chapters(client, study_id, exports, max_workers)
+            except AuthenticationError:
+                # The token was revoked since it was last verified
+                save_verified_account(api_token, None)
+                raise
+
+    # Nothing went through - the token may have been revoked, so check it
+    # again on the next run
+    if not chapters:
+        save_verified_account(api_token, None)
 
     study_url = f"https://lichess.org/study/{study_id}"
     console.print(f"\n[green]✓ Upload complete![/green]")
@@ -1,8 +1,11 @@
 """Pydantic models for configuration validation."""
 
 import os
+import stat
 from typing import List, Optional, Literal
-from pydantic import BaseModel, Field, field_validator, model_validator
+from pydantic import BaseModel, Field, PrivateAttr, field_validator, model_validator
+
+from .utils import RangeSet, parse_range_set
 
 
 class VariationFilter(BaseModel):
@@ -111,6 +114,10 @@ class ColorConfig(BaseModel):
         None, description="Plan comments to add/override"
     )
 
+    # 1-based game indices parsed from the skip/include shorthand
+    _skip_indices: Optional[RangeSet] = PrivateAttr(None)
+    _include_indices: Optional[RangeSet] = PrivateAttr(None)
+
     @model_validator(mode="after")
     def validate_game_specification(self):
         """Validate game specification and mutual exclusions."""
@@ -129,8 +136,47 @@ class ColorConfig(BaseModel):
         # CAN mix games list with shorthand (for detailed control on specific games)
         # The games list will override the shorthand for those specific indices
 
+        self._parse_shorthand()
         return self
 
+    def _parse_shorthand(self) -> None:
+        """
+        Parse the skip/include shorthand into the private index sets.
+
+        Ranges are parsed once and kept as ranges rather than expanded,
+        so a wide range like "1-100000" stays small.
+
+        Raises:
+            ValueError: If either shorthand has invalid syntax
+        """
+        if self.skip:
+            try:
+                self._skip_indices = parse_range_set(self.skip)
+            except ValueError as e:
+                raise ValueError(f"Color '{self.color}': Invalid 'skip' syntax: {e}")
+
+        if self.include:
+            try:
+                self._include_indices = parse_range_set(self.include)
+            except ValueError as e:
+                raise ValueError(f"Color '{self.color}': Invalid 'include' syntax: {e}")
+
+    def is_included(self, game_num: int) -> bool:
+        """
+        Check whether the skip/include shorthand keeps a game.
+
+        Args:
+            game_num: 1-based game index
+
+        Returns:
+            True if the game is included by the shorthand
+        """
+        if self._skip_indices is not None:
+            return game_num not in self._skip_indices
+        if self._include_indices is not None:
+            return game_num in self._include_indices
+        return True
+
 
 class Config(BaseModel):
     """Complete configuration for PGN curation."""
@@ -150,8 +196,13 @@ class Config(BaseModel):
     @field_validator("source")
     @classmethod
     def validate_source_exists(cls, v: str) -> str:
-        if not os.path.exists(v):
+        # One stat covers both existence and file type
+        try:
+            st = os.stat(v)
+        except OSError:
             raise ValueError(f"Source file not found: {v}")
+        if not stat.S_ISREG(st.st_mode):
+            raise ValueError(f"Source path is not a file: {v}")
         if not v.endswith(".pgn"):
             raise ValueError(f"Source file must be a PGN file: {v}")
         return v
@@ -174,9 +225,11 @@ class Config(BaseModel):
             raise ValueError("Must specify at least one color configuration in 'configs'")
 
         # Check for duplicate colors
-        colors = [c.color for c in self.configs]
-        if len(colors) != len(set(colors)):
-            raise ValueError("Cannot have duplicate color configurations")
+        seen = set()
+        for color_config in self.configs:
+            if color_config.color in seen:
+                raise ValueError("Cannot have duplicate color configurations")
+            seen.add(color_config.color)
 
         return self
 
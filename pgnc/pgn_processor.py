@@ -1,12 +1,20 @@
 """PGN parsing, filtering, and processing."""
 
+import sys
+
 import chess
 import chess.pgn
-from typing import List, Optional, Tuple
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 from io import StringIO
 
 from .models import Game as GameConfig, VariationFilter
 
+# Read buffer for whole-file PGN scans (fewer read syscalls on large dumps)
+PGN_READ_BUFFER = 1 << 20
+
+# Write buffer for PGN output files
+PGN_WRITE_BUFFER = 1 << 20
+
 
 def parse_pgn(pgn_path: str) -> List[chess.pgn.Game]:
     """
@@ -18,15 +26,66 @@ def parse_pgn(pgn_path: str) -> List[chess.pgn.Game]:
     Returns:
         List of chess.pgn.Game objects
     """
-    games = []
-    with open(pgn_path, "r") as f:
+    return list(iter_pgn(pgn_path))
+
+
+def iter_pgn(pgn_path: str) -> Iterator[chess.pgn.Game]:
+    """
+    Parse PGN file lazily, yielding one game at a time.
+
+    Args:
+        pgn_path: Path to PGN file
+
+    Yields:
+        chess.pgn.Game objects in file order
+    """
+    with open(pgn_path, "r", buffering=PGN_READ_BUFFER) as f:
         while True:
             game = chess.pgn.read_game(f)
             if game is None:
                 break
-            games.append(game)
+            yield game
+
 
-    return games
+def index_pgn(pgn_path: str) -> List[int]:
+    """
+    Find the start offset of every game without parsing move text.
+
+    Only headers are parsed, so this is much cheaper than parse_pgn and
+    gives the game count up front. Offsets can be passed to seek() on a
+    file opened in text mode to read a single game.
+
+    Args:
+        pgn_path: Path to PGN file
+
+    Returns:
+        List of file offsets, one per game
+    """
+    offsets = []
+    with open(pgn_path, "r", buffering=PGN_READ_BUFFER) as f:
+        while True:
+            offset = f.tell()
+            if chess.pgn.read_headers(f) is None:
+                break
+            offsets.append(offset)
+
+    return offsets
+
+
+def read_game_at(pgn_path: str, offset: int) -> Optional[chess.pgn.Game]:
+    """
+    Parse the single game starting at an offset returned by index_pgn.
+
+    Args:
+        pgn_path: Path to PGN file
+        offset: Start offset of the game
+
+    Returns:
+        chess.pgn.Game object, or None if there is no game at the offset
+    """
+    with open(pgn_path, "r") as f:
+        f.seek(offset)
+        return chess.pgn.read_game(f)
 
 
 def parse_move_sequence(move_string: str) -> List[chess.Move]:
@@ -76,14 +135,153 @@ def matches_variation_pattern(
     Returns:
         True if move_path starts with pattern_moves
     """
-    if len(move_path) < len(pattern_moves):
+    # Compare the prefix as one list slice rather than move by move
+    n = len(pattern_moves)
+    return len(move_path) >= n and move_path[:n] == pattern_moves
+
+
+# A variation filter with its move sequence already parsed: (moves, depth)
+ParsedFilter = Tuple[List[chess.Move], Optional[int]]
+
+
+def parse_variation_filters(
+    filters: Optional[List[VariationFilter]],
+) -> List[ParsedFilter]:
+    """
+    Parse the move sequences of variation filters once, up front.
+
+    Args:
+        filters: Variation filters from the game config (may be None)
+
+    Returns:
+        List of (pattern moves, depth) tuples; filters with an invalid
+        move sequence are left out
+    """
+    parsed = []
+    for variation_filter in filters or ():
+        try:
+            moves = parse_move_sequence(variation_filter.moves)
+        except ValueError:
+            # Invalid move sequence in filter, skip it
+            continue
+        parsed.append((moves, variation_filter.depth))
+
+    return parsed
+
+
+# Parsed filters grouped for lookup: pattern length -> pattern -> depth bound
+FilterIndex = Dict[int, Dict[Tuple[chess.Move, ...], float]]
+
+
+def index_variation_filters(
+    filters: List[ParsedFilter], remove: bool
+) -> FilterIndex:
+    """
+    Group parsed filters by pattern length for hash lookup.
+
+    Each pattern maps to the depth bound that decides whether it applies.
+    For remove filters the path must be longer than the bound (0 when no
+    depth is set); for add filters it must be no longer than the bound
+    (infinity when no depth is set). Patterns listed more than once keep
+    the most permissive bound, matching a first-match scan.
+
+    Args:
+        filters: Parsed variation filters
+        remove: True for remove filters, False for add filters
+
+    Returns:
+        Dict of pattern length -> {pattern tuple: depth bound}
+    """
+    index: FilterIndex = {}
+    for pattern_moves, depth in filters:
+        patterns = index.setdefault(len(pattern_moves), {})
+        key = tuple(pattern_moves)
+        if remove:
+            bound = depth or 0
+            patterns[key] = min(bound, patterns.get(key, bound))
+        else:
+            bound = depth or float("inf")
+            patterns[key] = max(bound, patterns.get(key, bound))
+
+    return index
+
+
+# Rolling hash of a move path: one multiply-add per move, so the hash of
+# every prefix of the current path can be kept on a stack during a walk
+_PATH_HASH_SEED = 0
+_PATH_HASH_MULT = 0x9E3779B97F4A7C15
+_HASH_MASK = (1 << 64) - 1
+
+
+def _extend_path_hash(path_hash: int, move: chess.Move) -> int:
+    """Return the rolling hash of a path extended by one move."""
+    return (path_hash * _PATH_HASH_MULT + hash(move)) & _HASH_MASK
+
+
+def _compile_skip_predicate(
+    remove_filters: List[ParsedFilter], add_filters: List[ParsedFilter]
+) -> Optional[Callable[[List[chess.Move], List[int]], bool]]:
+    """
+    Specialize should_skip_variation to one set of parsed filters.
+
+    Patterns are grouped by length and keyed by their rolling hash. The
+    predicate gets the rolling hash of every prefix of the path (built with
+    _extend_path_hash from _PATH_HASH_SEED), so testing a pattern length is
+    one dict probe on an int; only a hash hit is confirmed by comparing
+    moves. The add-filter pass is left out when there are no add filters.
+
+    Args:
+        remove_filters: Parsed variations to remove from source
+        add_filters: Parsed variations to add (overrides removal)
+
+    Returns:
+        Predicate taking (move path, prefix hashes) and returning True to
+        skip the path, where prefix_hashes[n] is the hash of move_path[:n];
+        or None when no variation can be skipped (there are no remove filters)
+    """
+    if not remove_filters:
+        return None
+
+    def hashed_groups(index: FilterIndex) -> tuple:
+        """Re-key each length group by pattern hash: (length, {hash: entries})."""
+        groups = []
+        for length, patterns in index.items():
+            by_hash = {}
+            for pattern, bound in patterns.items():
+                path_hash = _PATH_HASH_SEED
+                for move in pattern:
+                    path_hash = _extend_path_hash(path_hash, move)
+                by_hash.setdefault(path_hash, []).append((list(pattern), bound))
+            groups.append((length, by_hash))
+        return tuple(groups)
+
+    remove_groups = hashed_groups(index_variation_filters(remove_filters, remove=True))
+    add_groups = hashed_groups(index_variation_filters(add_filters, remove=False))
+
+    def is_removed(move_path: List[chess.Move], prefix_hashes: List[int]) -> bool:
+        path_len = len(move_path)
+        for length, by_hash in remove_groups:
+            if length <= path_len:
+                for pattern, bound in by_hash.get(prefix_hashes[length], ()):
+                    if path_len > bound and move_path[:length] == pattern:
+                        return True
         return False
 
-    for i, pattern_move in enumerate(pattern_moves):
-        if move_path[i] != pattern_move:
+    if not add_groups:
+        return is_removed
+
+    def skip(move_path: List[chess.Move], prefix_hashes: List[int]) -> bool:
+        if not is_removed(move_path, prefix_hashes):
             return False
+        path_len = len(move_path)
+        for length, by_hash in add_groups:
+            if length <= path_len:
+                for pattern, bound in by_hash.get(prefix_hashes[length], ()):
+                    if path_len <= bound and move_path[:length] == pattern:
+                        return False
+        return True
 
-    return True
+    return skip
 
 
 def should_skip_variation(
@@ -99,6 +297,9 @@ def should_skip_variation(
     - If variation matches add_filters: keep it (even if it was removed)
     - Otherwise: keep it (default)
 
+    Checks a single path; game walks compile the filters once with
+    _compile_skip_predicate instead.
+
     Args:
         move_path: Current variation's move sequence
         remove_filters: Variations to remove from source
@@ -107,49 +308,17 @@ def should_skip_variation(
     Returns:
         True if variation should be skipped
     """
-    should_remove = False
-    should_add = False
-
-    # Check if variation matches remove filters
-    if remove_filters:
-        for remove_filter in remove_filters:
-            try:
-                pattern_moves = parse_move_sequence(remove_filter.moves)
-                if matches_variation_pattern(move_path, pattern_moves):
-                    # Check depth constraint if specified
-                    if remove_filter.depth and len(move_path) <= remove_filter.depth:
-                        continue
-                    should_remove = True
-                    break
-            except ValueError:
-                # Invalid move sequence in filter, skip it
-                continue
+    skip = _compile_skip_predicate(
+        parse_variation_filters(remove_filters), parse_variation_filters(add_filters)
+    )
+    if skip is None:
+        return False  # Keep it (no remove filters)
 
-    # Check if variation matches add filters
-    if add_filters:
-        for add_filter in add_filters:
-            try:
-                pattern_moves = parse_move_sequence(add_filter.moves)
-                if matches_variation_pattern(move_path, pattern_moves):
-                    # Check depth constraint if specified
-                    if add_filter.depth and len(move_path) > add_filter.depth:
-                        continue
-                    should_add = True
-                    break
-            except ValueError:
-                # Invalid move sequence in filter, skip it
-                continue
+    prefix_hashes = [_PATH_HASH_SEED]
+    for move in move_path:
+        prefix_hashes.append(_extend_path_hash(prefix_hashes[-1], move))
 
-    # Union logic: (all - removed) ∪ added
-    # - If should_add: keep it (add overrides remove)
-    # - If should_remove and not should_add: skip it
-    # - Otherwise: keep it (default)
-    if should_add:
-        return False  # Keep it (in the added set)
-    elif should_remove:
-        return True   # Skip it (removed and not added back)
-    else:
-        return False  # Keep it (default - in the "all" set)
+    return skip(move_path, prefix_hashes)
 
 
 def filter_game_variations(
@@ -178,66 +347,36 @@ def filter_game_variations(
     filtered = chess.pgn.Game()
     copy_headers(game, filtered)
 
-    # Traverse and filter variations
-    def traverse_and_filter(src_node, dst_node, current_path=[]):
-        """Recursively traverse game tree and filter variations."""
-        variations_added = 0
+    # Parse filter move sequences once instead of at every node
+    remove_filters = parse_variation_filters(game_config.remove_variations)
+    add_filters = parse_variation_filters(game_config.add_variations)
 
-        for variation in src_node.variations:
-            new_path = current_path + [variation.move]
-
-            # Check if this variation should be skipped
-            if should_skip_variation(
-                new_path, game_config.remove_variations, game_config.add_variations
-            ):
-                continue
-
-            # Keep this variation
-            new_node = dst_node.add_variation(variation.move)
-
-            # Copy comments and annotations
-            if variation.comment:
-                new_node.comment = variation.comment
-            if variation.nags:
-                new_node.nags = variation.nags.copy()
-
-            variations_added += 1
-
-            # Recurse to child variations
-            traverse_and_filter(variation, new_node, new_path)
-
-        return variations_added
-
-    traverse_and_filter(game, filtered)
-
-    # Add variations that don't exist in the source
-    if game_config.add_variations:
-        for add_filter in game_config.add_variations:
-            try:
-                moves = parse_move_sequence(add_filter.moves)
-                _add_variation_to_game(filtered, moves)
-            except ValueError:
-                # Invalid move sequence, skip it
-                continue
+    # No depth limit: every kept variation is copied in full
+    _filter_and_trim(game, filtered, sys.maxsize, remove_filters, add_filters)
 
     return filtered
 
 
-def _add_variation_to_game(game: chess.pgn.Game, moves: List[chess.Move]):
+def _add_variation_to_game(
+    game: chess.pgn.Game, moves: List[chess.Move]
+) -> Tuple[int, int]:
     """
     Add a variation to a game, constructing the path if it doesn't exist.
 
     Args:
         game: Game to add variation to
         moves: Sequence of moves to add
+
+    Returns:
+        Tuple of (leaf nodes added (0 or 1), change in total leaf depth)
     """
     if not moves:
-        return
+        return 0, 0
 
     current_node = game
     board = game.board()
 
-    for move in moves:
+    for depth, move in enumerate(moves):
         # Check if this move already exists as a variation
         existing_var = None
         for variation in current_node.variations:
@@ -249,10 +388,21 @@ def _add_variation_to_game(game: chess.pgn.Game, moves: List[chess.Move]):
             # Move already exists, continue down this path
             current_node = existing_var
             board.push(move)
+            continue
+
+        # Move doesn't exist, create the rest of the path from here.
+        # Branching off a node that already has variations adds a new leaf;
+        # extending a leaf just moves it deeper.
+        if current_node.variations:
+            leaves_added, depth_added = 1, len(moves)
         else:
-            # Move doesn't exist, create it
-            current_node = current_node.add_variation(move)
-            board.push(move)
+            leaves_added, depth_added = 0, len(moves) - depth
+        for new_move in moves[depth:]:
+            current_node = current_node.add_variation(new_move)
+            board.push(new_move)
+        return leaves_added, depth_added
+
+    return 0, 0
 
 
 def trim_game_depth(game: chess.pgn.Game, max_depth: int) -> chess.pgn.Game:
@@ -272,30 +422,140 @@ def trim_game_depth(game: chess.pgn.Game, max_depth: int) -> chess.pgn.Game:
     trimmed = chess.pgn.Game()
     copy_headers(game, trimmed)
 
-    def traverse_and_trim(src_node, dst_node, depth=0):
-        """Recursively traverse and trim to max depth."""
-        if depth >= max_depth:
-            # Reached max depth, stop here
-            # Preserve any comment at this position
-            if src_node.comment:
-                dst_node.comment = src_node.comment
-            return
+    # Trimming alone is the fused walk without filters
+    _filter_and_trim(game, trimmed, max_depth, [], [])
+
+    # A zero-depth trim still keeps the comment at the root
+    if max_depth <= 0 and game.comment:
+        trimmed.comment = game.comment
 
-        for variation in src_node.variations:
-            new_node = dst_node.add_variation(variation.move)
+    return trimmed
 
-            # Copy comments and annotations
-            if variation.comment:
-                new_node.comment = variation.comment
-            if variation.nags:
-                new_node.nags = variation.nags.copy()
 
-            # Recurse
-            traverse_and_trim(variation, new_node, depth + 1)
+def filter_trim_count(
+    game: chess.pgn.Game, game_config: GameConfig, max_depth: int
+) -> Tuple[Optional[chess.pgn.Game], int, float]:
+    """
+    Filter variations, trim to max depth and collect variation stats in one pass.
 
-    traverse_and_trim(game, trimmed)
+    Equivalent to filter_game_variations followed by trim_game_depth and
+    get_variation_stats, but walks the source tree only once.
 
-    return trimmed
+    Args:
+        game: Source game with variations
+        game_config: Configuration for filtering
+        max_depth: Maximum number of half-moves (plies) to keep
+
+    Returns:
+        Tuple of (new game, number of variations in it, average depth in
+        half-moves); the game is None (with 0 variations) when the action
+        is "skip"
+    """
+    if game_config.action == "skip":
+        return None, 0, 0.0
+
+    if game_config.action == "skip_keep_headers":
+        filtered = chess.pgn.Game()
+        copy_headers(game, filtered)
+        return filtered, 0, 0.0
+
+    filtered = chess.pgn.Game()
+    copy_headers(game, filtered)
+
+    # Parse filter move sequences once instead of at every node
+    remove_filters = parse_variation_filters(game_config.remove_variations)
+    add_filters = parse_variation_filters(game_config.add_variations)
+
+    count, total_depth = _filter_and_trim(
+        game, filtered, max_depth, remove_filters, add_filters
+    )
+
+    return filtered, count, (total_depth / count if count else 0.0)
+
+
+def _filter_and_trim(
+    game: chess.pgn.Game,
+    dst: chess.pgn.Game,
+    max_depth: int,
+    remove_filters: List[ParsedFilter],
+    add_filters: List[ParsedFilter],
+) -> Tuple[int, int]:
+    """
+    Copy kept variations of a game into dst, trimmed to max depth.
+
+    This is the single tree walk behind filter_game_variations,
+    trim_game_depth and filter_trim_count. The filter predicate and the
+    depth cutoff are applied in the same node visit, and leaves are counted
+    as they are reached.
+
+    Args:
+        game: Source game with variations
+        dst: Game to copy into (headers already set)
+        max_depth: Maximum number of half-moves (plies) to keep
+        remove_filters: Parsed variations to remove from source
+        add_filters: Parsed variations to add (overrides removal)
+
+    Returns:
+        Tuple of (number of variations in dst, total depth of those variations)
+    """
+    # None when nothing can be skipped: the walk is then a plain tree copy
+    skip = _compile_skip_predicate(remove_filters, add_filters)
+
+    count = 0
+    total_depth = 0
+
+    # Copy kept variations up to max depth depth-first with a stack of
+    # child iterators, sharing one path list (its length is the depth).
+    # A node is counted as a leaf when it is left without kept children.
+    # When filtering, the rolling hash of each prefix is kept alongside.
+    current_path = []
+    prefix_hashes = [_PATH_HASH_SEED]
+    stack = [(iter(game.variations if max_depth > 0 else ()), dst)]
+    while stack:
+        variations, dst_node = stack[-1]
+        variation = next(variations, None)
+        if variation is None:
+            if not dst_node.variations:
+                # Leaf node - this is a complete variation
+                count += 1
+                total_depth += len(current_path)
+
+            # All children visited, backtrack
+            stack.pop()
+            if stack:
+                current_path.pop()
+                if skip is not None:
+                    prefix_hashes.pop()
+            continue
+
+        current_path.append(variation.move)
+
+        if skip is not None:
+            prefix_hashes.append(_extend_path_hash(prefix_hashes[-1], variation.move))
+            if skip(current_path, prefix_hashes):
+                current_path.pop()
+                prefix_hashes.pop()
+                continue
+
+        new_node = dst_node.add_variation(variation.move)
+
+        # Copy comments and annotations
+        if variation.comment:
+            new_node.comment = variation.comment
+        if variation.nags:
+            new_node.nags = variation.nags.copy()
+
+        # Children past max depth are not visited
+        children = variation.variations if len(current_path) < max_depth else ()
+        stack.append((iter(children), new_node))
+
+    # Add variations that don't exist in the source, trimmed like the rest
+    for moves, _ in add_filters:
+        leaves_added, depth_added = _add_variation_to_game(dst, moves[:max_depth])
+        count += leaves_added
+        total_depth += depth_added
+
+    return count, total_depth
 
 
 def copy_headers(src_game: chess.pgn.Game, dst_game: chess.pgn.Game):
@@ -317,24 +577,7 @@ def count_variations(game: chess.pgn.Game) -> int:
     Returns:
         Total number of variations (leaf nodes)
     """
-    if game is None:
-        return 0
-
-    count = 0
-
-    def traverse(node):
-        nonlocal count
-        if not list(node.variations):
-            # Leaf node - this is a complete variation
-            count += 1
-            return
-        
-        # Recurse into all variations
-        for variation in node.variations:
-            traverse(variation)
-
-    traverse(game)
-    return count
+    return get_variation_stats(game)[0]
 
 
 def get_average_depth(game: chess.pgn.Game) -> float:
@@ -347,49 +590,76 @@ def get_average_depth(game: chess.pgn.Game) -> float:
     Returns:
         Average depth in half-moves
     """
-    if game is None:
-        return 0.0
+    return get_variation_stats(game)[1]
 
-    depths = []
 
-    def traverse(node, depth=0):
-        if not list(node.variations):
-            # Leaf node
-            depths.append(depth)
-            return
+def get_variation_stats(game: chess.pgn.Game) -> Tuple[int, float]:
+    """
+    Count variations and calculate their average depth in a single pass.
+
+    Args:
+        game: Game to analyze
+
+    Returns:
+        Tuple of (number of variations, average depth in half-moves)
+    """
+    if game is None:
+        return 0, 0.0
 
-        for variation in node.variations:
-            traverse(variation, depth + 1)
+    leaf_count = 0
+    total_depth = 0
+    stack = [(game, 0)]
 
-    traverse(game)
+    while stack:
+        node, depth = stack.pop()
+        if node.variations:
+            stack.extend((variation, depth + 1) for variation in node.variations)
+        else:
+            # Leaf node - this is a complete variation
+            leaf_count += 1
+            total_depth += depth
 
-    return sum(depths) / len(depths) if depths else 0.0
+    return leaf_count, (total_depth / leaf_count if leaf_count else 0.0)
 
 
-def write_pgn(games: List[chess.pgn.Game], output_path: str, add_metadata: bool = True):
+def write_pgn(
+    games: Iterable[chess.pgn.Game], output_path: str, add_metadata: bool = True
+) -> int:
     """
     Write games to PGN file.
 
     Args:
-        games: List of games to write
+        games: Games to write (any iterable; it is consumed once)
         output_path: Output file path
         add_metadata: Whether to add curation metadata comment
+
+    Returns:
+        Number of bytes written
     """
-    with open(output_path, "w") as f:
+    # Stream every game through one exporter bound to a buffered file.
+    # FileExporter ends each game with a blank line, which is the separator.
+    # newline="\n" keeps LF line endings on every platform.
+    with open(
+        output_path, "w", encoding="utf-8", newline="\n", buffering=PGN_WRITE_BUFFER
+    ) as f:
+        exporter = chess.pgn.FileExporter(
+            f, headers=True, variations=True, comments=True
+        )
         for i, game in enumerate(games):
             if game is None:
                 continue
 
-            # Add curation metadata if requested
-            if add_metadata and i == 0:
-                # Add to first game's headers
-                if "Curator" not in game.headers:
-                    game.headers["Curator"] = "pgn-curator v0.1.0"
-
-            # Write game
-            exporter = chess.pgn.StringExporter(
-                headers=True, variations=True, comments=True
-            )
-            pgn_string = game.accept(exporter)
-            f.write(pgn_string)
-            f.write("\n\n")
+            # Add curation metadata to first game's headers if requested.
+            # It is removed again after export so the game is left unchanged
+            # (the same game object may be written to several files).
+            add_curator = add_metadata and i == 0 and "Curator" not in game.headers
+            if add_curator:
+                game.headers["Curator"] = "pgn-curator v0.1.0"
+
+            game.accept(exporter)
+            if add_curator:
+                del game.headers["Curator"]
+
+        size = f.tell()
+
+    return size
@@ -1,19 +1,33 @@
 """Prefix tree optimization for variation lists."""
 
+import sys
+
 import chess
 import chess.pgn
-from typing import List, Set, Dict, Tuple
-from dataclasses import dataclass, field
+from typing import List, Optional, Set, Dict, Tuple
 
 
-@dataclass
 class PrefixNode:
     """Node in the prefix tree."""
 
-    move: str = None  # SAN notation (e.g., "e4", "Nf3")
-    children: Dict[str, 'PrefixNode'] = field(default_factory=dict)
-    is_leaf: bool = False  # True if this path appears in the variation list
-    traversal_order: int = -1  # Order from game tree DFS traversal
+    # A plain class rather than a dataclass: per-node __slots__ with field
+    # defaults needs dataclass(slots=True), which needs Python 3.10
+    __slots__ = (
+        "move",
+        "children",
+        "is_leaf",
+        "all_leaves",
+        "leaf_count",
+        "removed_count",
+    )
+
+    def __init__(self, move: str = None):
+        self.move = move  # SAN notation (e.g., "e4", "Nf3")
+        self.children: Dict[str, 'PrefixNode'] = {}
+        self.is_leaf = False  # True if this path appears in the variation list
+        self.all_leaves: Optional[bool] = None  # Memo: every descendant leaf is_leaf
+        self.leaf_count = 0  # Game variations at or below this node
+        self.removed_count = 0  # Of those, how many are being removed
 
 
 class PrefixTree:
@@ -26,9 +40,11 @@ class PrefixTree:
         """Insert a move sequence into the tree."""
         node = self.root
         for move in moves:
-            if move not in node.children:
-                node.children[move] = PrefixNode(move=move)
-            node = node.children[move]
+            child = node.children.get(move)
+            if child is None:
+                child = PrefixNode(move=move)
+                node.children[move] = child
+            node = child
         node.is_leaf = True
 
     def find_minimal_covering_set(self) -> List[List[str]]:
@@ -39,38 +55,39 @@ class PrefixTree:
             List of move sequences (as lists) representing the minimal covering set
         """
         covering_set = []
+        self._compute_all_leaves()
+
+        # Iterative DFS from root's children; children are pushed in reverse
+        # so they are visited in insertion order
+        stack = [
+            (child, [move]) for move, child in reversed(self.root.children.items())
+        ]
+        while stack:
+            node, path = stack.pop()
 
-        def traverse(node: PrefixNode, path: List[str]):
-            """DFS to find minimal covering nodes."""
             if not node.children:
                 # Leaf node with no children - must include it
                 if node.is_leaf:
-                    covering_set.append(path[:])
-                return
+                    covering_set.append(path)
+                continue
 
             # Check if all descendants of this node are in the variation list
-            all_descendants_are_leaves = self._all_descendants_are_leaves(node)
-
-            if all_descendants_are_leaves:
+            if node.all_leaves:
                 # All variations under this node are being removed
                 # Use this node as the covering point (even if it wasn't explicitly in the list)
-                covering_set.append(path[:])
-                return
-
-            # Otherwise, recurse into children
-            for move, child in node.children.items():
-                traverse(child, path + [move])
+                covering_set.append(path)
+                continue
 
-        # Start traversal from root's children
-        for move, child in self.root.children.items():
-            traverse(child, [move])
+            # Otherwise, descend into children
+            children = reversed(node.children.items())
+            stack.extend((child, path + [move]) for move, child in children)
 
         return covering_set
 
     def find_minimal_covering_set_validated(
         self,
-        variations_to_remove: Set[str],
-        all_game_variations: Set[str]
+        variations_to_remove: Set[Tuple[str, ...]],
+        all_game_variations: Set[Tuple[str, ...]]
     ) -> List[List[str]]:
         """
         Find minimal set of prefixes that cover variations, validated against original game.
@@ -79,46 +96,50 @@ class PrefixTree:
         are being removed before using that prefix as a covering point.
 
         Args:
-            variations_to_remove: Set of variation strings being removed
-            all_game_variations: Set of ALL variation strings in the original game
+            variations_to_remove: Set of SAN move tuples being removed
+            all_game_variations: Set of ALL SAN move tuples in the original game
 
         Returns:
             List of move sequences (as lists) representing the minimal covering set
         """
         covering_set = []
 
-        def traverse(node: PrefixNode, path: List[str]):
-            """DFS to find minimal covering nodes with validation."""
+        # Index the game's variations once so each candidate prefix is
+        # checked by walking down the tree, not by scanning every variation
+        game_tree = _build_game_tree(all_game_variations, variations_to_remove)
+
+        # Iterative DFS from root's children, in insertion order
+        stack = [
+            (child, [move]) for move, child in reversed(self.root.children.items())
+        ]
+        while stack:
+            node, path = stack.pop()
+
             if not node.children:
                 # Leaf node with no children - must include it
                 if node.is_leaf:
-                    covering_set.append(path[:])
-                return
+                    covering_set.append(path)
+                continue
 
             # Check if we can use this node as a covering point
             # by verifying ALL game variations with this prefix are being removed
             if all_game_variations and self._can_use_as_covering_point(
-                path, variations_to_remove, all_game_variations
+                path, game_tree
             ):
                 # All variations in the original game with this prefix are being removed
-                covering_set.append(path[:])
-                return
-
-            # Otherwise, recurse into children
-            for move, child in node.children.items():
-                traverse(child, path + [move])
+                covering_set.append(path)
+                continue
 
-        # Start traversal from root's children
-        for move, child in self.root.children.items():
-            traverse(child, [move])
+            # Otherwise, descend into children
+            children = reversed(node.children.items())
+            stack.extend((child, path + [move]) for move, child in children)
 
         return covering_set
 
     def _can_use_as_covering_point(
         self,
         prefix_moves: List[str],
-        variations_to_remove: Set[str],
-        all_game_variations: Set[str]
+        game_tree: "PrefixTree"
     ) -> bool:
         """
         Check if a prefix can be used as a covering point.
@@ -128,45 +149,78 @@ class PrefixTree:
 
         Args:
             prefix_moves: The prefix move sequence to check
-            variations_to_remove: Set of variations being removed
-            all_game_variations: Set of all variations in the game
+            game_tree: Tree of all game variations from _build_game_tree
 
         Returns:
             True if this prefix covers all matching variations
         """
-        prefix_str = _format_move_list_to_pgn(prefix_moves)
-
-        # Find all variations in the game that start with this prefix
-        # Use proper prefix matching (must be followed by space or end of string)
-        matching_game_vars = []
-        for game_var in all_game_variations:
-            if game_var == prefix_str or game_var.startswith(prefix_str + " "):
-                matching_game_vars.append(game_var)
-
-        if not matching_game_vars:
-            # No variations in game match this prefix - shouldn't happen
-            return False
-
-        # Check if ALL matching variations are in the removal set
-        for game_var in matching_game_vars:
-            if game_var not in variations_to_remove:
-                # Found a variation in the game that's NOT being removed
+        node = game_tree.root
+        for move in prefix_moves:
+            node = node.children.get(move)
+            if node is None:
+                # No variations in game match this prefix - shouldn't happen
                 return False
 
-        # All matching variations are being removed - can use this prefix
-        return True
+        # Usable only if every game variation below the prefix is being removed
+        return node.leaf_count > 0 and node.leaf_count == node.removed_count
 
-    def _all_descendants_are_leaves(self, node: PrefixNode) -> bool:
-        """Check if all descendants of this node are marked as leaves."""
-        if not node.children:
-            return node.is_leaf
+    def _compute_all_leaves(self):
+        """
+        Set all_leaves on every node in a single post-order pass.
 
-        # Check all children recursively
-        for child in node.children.values():
-            if not self._all_descendants_are_leaves(child):
-                return False
+        A childless node is all-leaves if it is a leaf itself; any other
+        node is all-leaves if all of its children are.
+        """
+        # Collect nodes in pre-order; reversed, every child precedes its parent
+        order = []
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            order.append(node)
+            stack.extend(node.children.values())
+
+        for node in reversed(order):
+            if node.children:
+                node.all_leaves = all(
+                    child.all_leaves for child in node.children.values()
+                )
+            else:
+                node.all_leaves = node.is_leaf
+
+
+def _build_game_tree(
+    all_game_variations: Set[Tuple[str, ...]],
+    variations_to_remove: Set[Tuple[str, ...]]
+) -> PrefixTree:
+    """
+    Build a prefix tree of game variations with per-node counts.
 
-        return True
+    Every node on a variation's path gets its leaf_count incremented, and
+    its removed_count too when the variation is in the removal set.
+
+    Args:
+        all_game_variations: Set of ALL SAN move tuples in the original game
+        variations_to_remove: Set of SAN move tuples being removed
+
+    Returns:
+        PrefixTree annotated with leaf_count and removed_count
+    """
+    tree = PrefixTree()
+    for game_var in all_game_variations:
+        removed = game_var in variations_to_remove
+        node = tree.root
+        for move in game_var:
+            child = node.children.get(move)
+            if child is None:
+                child = PrefixNode(move=move)
+                node.children[move] = child
+            node = child
+            node.leaf_count += 1
+            if removed:
+                node.removed_count += 1
+        node.is_leaf = True
+
+    return tree
 
 
 def parse_move_sequence_to_list(move_string: str) -> List[str]:
@@ -186,14 +240,16 @@ def parse_move_sequence_to_list(move_string: str) -> List[str]:
         token = token.strip()
         if not token or token.isdigit():
             continue
-        moves.append(token)
+        # Interned so equal moves share one string object across variations
+        moves.append(sys.intern(token))
 
     return moves
 
 
 def optimize_variation_list(
     variations: List[str],
-    reference_game: chess.pgn.Game = None
+    reference_game: chess.pgn.Game = None,
+    reference_variations: Set[Tuple[str, ...]] = None
 ) -> List[str]:
     """
     Optimize a list of variation move sequences by finding minimal covering set.
@@ -201,6 +257,9 @@ def optimize_variation_list(
     Args:
         variations: List of move sequences (e.g., ["1.e4 c5 2.Nf3", "1.e4 e5"])
         reference_game: Optional game for determining traversal order AND validation
+        reference_variations: Optional precomputed set of all variation
+            paths in reference_game as SAN tuples (e.g., {("e4", "c5"), ...}),
+            so the game is not walked again
 
     Returns:
         Optimized list of move sequences (minimal covering set, deterministically ordered)
@@ -210,15 +269,20 @@ def optimize_variation_list(
 
     # Get all variations from the reference game if provided
     all_game_variations = set()
-    if reference_game:
+    if reference_variations is not None:
+        all_game_variations = reference_variations
+    elif reference_game:
         all_game_variations = _extract_all_variation_paths_from_game(reference_game)
 
-    # Build prefix tree
+    # Build prefix tree. Variations are parsed to SAN tuples once and are
+    # matched against the game as tuples; PGN text is only produced for the
+    # final result.
     tree = PrefixTree()
-    variations_set = set(variations)
+    variations_set = set()
     for var_string in variations:
         moves = parse_move_sequence_to_list(var_string)
         tree.insert(moves)
+        variations_set.add(tuple(moves))
 
     # Find minimal covering set
     covering_set = tree.find_minimal_covering_set_validated(
@@ -237,35 +301,40 @@ def optimize_variation_list(
     return optimized
 
 
-def _extract_all_variation_paths_from_game(game: chess.pgn.Game) -> Set[str]:
+def _extract_all_variation_paths_from_game(
+    game: chess.pgn.Game
+) -> Set[Tuple[str, ...]]:
     """
-    Extract all variation paths from a game as formatted strings.
+    Extract all variation paths from a game as SAN move tuples.
 
     Args:
         game: Chess game to extract variations from
 
     Returns:
-        Set of variation move sequences (e.g., {"1.e4 c5 2.Nf3 d6", ...})
+        Set of variation move sequences (e.g., {("e4", "c5", "Nf3", "d6"), ...})
     """
     variations = set()
 
-    def traverse(node, board, moves_san=[]):
+    moves_san = []
+    board = game.board()
+
+    def traverse(node):
         """DFS to extract all variation paths."""
         if not node.variations:
             # Leaf node - this is a complete variation
-            formatted = _format_move_list_to_pgn(moves_san)
-            variations.add(formatted)
+            variations.add(tuple(moves_san))
             return
 
-        # Traverse children
+        # Traverse children, sharing one board and one move list
+        # (push/append before, pop after) instead of copying the board
         for variation in node.variations:
-            new_board = board.copy()
-            move_san = new_board.san(variation.move)
-            new_board.push(variation.move)
+            moves_san.append(board.san_and_push(variation.move))
 
-            traverse(variation, new_board, moves_san + [move_san])
+            traverse(variation)
+            moves_san.pop()
+            board.pop()
 
-    traverse(game, game.board())
+    traverse(game)
 
     return variations
 
@@ -1,6 +1,24 @@
 """Utility functions for PGN Curator."""
 
-from typing import List, Set
+import hashlib
+import os
+import pickle
+import re
+from bisect import bisect_right
+from functools import lru_cache
+from itertools import chain
+from pathlib import Path
+from typing import Any, Iterable, Iterator, List, Optional, Set, Tuple
+
+from . import __version__
+
+
+# One item of a range string: a number or "start-end", with optional spaces
+_RANGE_ITEM = r"\s*(\d+)\s*(?:-\s*(\d+)\s*)?"
+_RANGE_ITEM_RE = re.compile(_RANGE_ITEM)
+
+# A whole range string: comma-separated items
+_RANGE_LIST_RE = re.compile(rf"{_RANGE_ITEM}(?:,{_RANGE_ITEM})*")
 
 
 def parse_range_string(range_str: str) -> Set[int]:
@@ -31,10 +49,59 @@ def parse_range_string(range_str: str) -> Set[int]:
         >>> parse_range_string("1,3,5-7,10")
         {1, 3, 5, 6, 7, 10}
     """
-    result = set()
-
     if not range_str.strip():
-        return result
+        return set()
+
+    if "-" not in range_str:
+        # Plain list of numbers: convert and collect them in one C-level pass
+        try:
+            return set(map(int, range_str.split(",")))
+        except ValueError:
+            # Let the part-by-part parser name the invalid number
+            return _parse_range_parts(range_str)
+
+    if _RANGE_LIST_RE.fullmatch(range_str) is None:
+        # Invalid (or unusual, e.g. "+3") syntax: the part-by-part parser
+        # reports exactly what is wrong
+        return _parse_range_parts(range_str)
+
+    # Collect numbers and ranges, then build the set in one call.
+    # findall yields (start, end) string pairs, end empty for a single
+    # number, without creating a match object per item.
+    pieces = []
+    for start_text, end_text in _RANGE_ITEM_RE.findall(range_str):
+        if not end_text:
+            # Single number
+            pieces.append((int(start_text),))
+            continue
+
+        # Range like "5-10"
+        start = int(start_text)
+        end = int(end_text)
+        if start > end:
+            raise ValueError(f"Invalid range: {start}-{end}. Start must be <= end")
+
+        pieces.append(range(start, end + 1))
+
+    return set(chain.from_iterable(pieces))
+
+
+def _parse_range_parts(range_str: str) -> Set[int]:
+    """
+    Parse a range string part by part, reporting the first invalid part.
+
+    Slow path of parse_range_string for strings its regex does not accept.
+
+    Args:
+        range_str: Range string to parse
+
+    Returns:
+        Set of integers
+
+    Raises:
+        ValueError: If syntax is invalid
+    """
+    result = set()
 
     # Split by comma
     parts = range_str.split(",")
@@ -73,6 +140,76 @@ def parse_range_string(range_str: str) -> Set[int]:
     return result
 
 
+class RangeSet:
+    """Set of integers stored as sorted, disjoint inclusive ranges."""
+
+    __slots__ = ("_starts", "_ends")
+
+    def __init__(self, ranges: Iterable[Tuple[int, int]] = ()):
+        """
+        Build the set from inclusive (start, end) ranges, merging overlaps.
+
+        Args:
+            ranges: Inclusive (start, end) pairs, in any order
+        """
+        self._starts: List[int] = []
+        self._ends: List[int] = []
+        for start, end in sorted(ranges):
+            if self._ends and start <= self._ends[-1] + 1:
+                # Overlaps or touches the previous range: extend it
+                if end > self._ends[-1]:
+                    self._ends[-1] = end
+            else:
+                self._starts.append(start)
+                self._ends.append(end)
+
+    def __contains__(self, n: int) -> bool:
+        i = bisect_right(self._starts, n) - 1
+        return i >= 0 and n <= self._ends[i]
+
+    def __iter__(self) -> Iterator[int]:
+        return chain.from_iterable(
+            range(start, end + 1) for start, end in zip(self._starts, self._ends)
+        )
+
+    def __len__(self) -> int:
+        return sum(end - start + 1 for start, end in zip(self._starts, self._ends))
+
+
+@lru_cache(maxsize=256)
+def parse_range_set(range_str: str) -> RangeSet:
+    """
+    Parse a range string like parse_range_string, without expanding ranges.
+
+    Membership tests cost a binary search over the ranges, so "1-1000000"
+    is stored as one pair instead of a million integers. Results are cached
+    (a RangeSet is never modified), so configs repeating the same shorthand
+    across colors parse it once.
+
+    Args:
+        range_str: Range string to parse
+
+    Returns:
+        RangeSet of the integers in range_str
+
+    Raises:
+        ValueError: If syntax is invalid (same messages as parse_range_string)
+    """
+    if "-" not in range_str or _RANGE_LIST_RE.fullmatch(range_str) is None:
+        # No ranges to keep compact, or syntax the regex does not accept
+        return RangeSet((n, n) for n in parse_range_string(range_str))
+
+    ranges = []
+    for start_text, end_text in _RANGE_ITEM_RE.findall(range_str):
+        start = int(start_text)
+        end = int(end_text) if end_text else start
+        if start > end:
+            raise ValueError(f"Invalid range: {start}-{end}. Start must be <= end")
+        ranges.append((start, end))
+
+    return RangeSet(ranges)
+
+
 def expand_game_indices(
     games_config: List, total_games: int, one_based: bool = True
 ) -> dict:
@@ -90,17 +227,115 @@ def expand_game_indices(
     index_to_config = {}
 
     for game_cfg in games_config:
-        if isinstance(game_cfg, dict) and "index" in game_cfg:
-            # Individual game
-            idx = game_cfg["index"]
-            if one_based:
-                idx = idx - 1  # Convert to 0-based
+        # Individual game: look the index up once
+        raw_index = game_cfg.get("index") if isinstance(game_cfg, dict) else None
+        if raw_index is None:
+            continue
 
-            if idx < 0 or idx >= total_games:
-                raise ValueError(
-                    f"Game index {game_cfg['index']} out of range (1-{total_games})"
-                )
+        idx = raw_index - 1 if one_based else raw_index  # Convert to 0-based
+        if not 0 <= idx < total_games:
+            raise ValueError(f"Game index {raw_index} out of range (1-{total_games})")
 
-            index_to_config[idx] = game_cfg
+        index_to_config[idx] = game_cfg
 
     return index_to_config
+
+
+def pickle_cache_file(
+    cache_dir: Path, source: Path, min_size: int, *key_parts: str
+) -> Optional[Path]:
+    """
+    Get the cache file for data derived from a source file.
+
+    The key covers the source's identity and contents (path, mtime, size),
+    the pgnc version and any extra key_parts the cached data depends on.
+
+    Args:
+        cache_dir: Directory holding the cache entries
+        source: File the cached data is derived from
+        min_size: Sources smaller than this are not cached
+        key_parts: Extra values the cached data depends on
+
+    Returns:
+        Path of the cache entry, or None if the source should not be cached
+    """
+    try:
+        stat = source.stat()
+    except OSError:
+        return None
+
+    if stat.st_size < min_size:
+        return None
+
+    key = hashlib.sha256(
+        ":".join(
+            (str(source.resolve()), str(stat.st_mtime_ns), str(stat.st_size),
+             __version__) + key_parts
+        ).encode()
+    ).hexdigest()
+    return cache_dir / f"{key}.pkl"
+
+
+def read_pickle_cache(cache_file: Path, cache_format: int) -> Optional[Any]:
+    """
+    Load a cache entry written by write_pickle_cache.
+
+    Args:
+        cache_file: Path from pickle_cache_file
+        cache_format: Format the entry must have been written with
+
+    Returns:
+        The cached value, or None on a miss or an unusable entry
+    """
+    try:
+        with open(cache_file, "rb") as f:
+            entry = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, EOFError, pickle.UnpicklingError, ValueError,
+            AttributeError, ImportError):
+        # Corrupt or incompatible entry - ignore it
+        return None
+
+    if not (isinstance(entry, tuple) and len(entry) == 2 and entry[0] == cache_format):
+        # Written by an older layout of the cached data
+        return None
+
+    # Mark as recently used for the purge in write_pickle_cache
+    try:
+        os.utime(cache_file)
+    except OSError:
+        pass
+
+    return entry[1]
+
+
+def write_pickle_cache(
+    cache_file: Path, value: Any, cache_format: int, max_entries: int
+) -> None:
+    """
+    Store a cache entry, keeping only the most recently used entries.
+
+    Args:
+        cache_file: Path from pickle_cache_file
+        value: Picklable value to store
+        cache_format: Format tag checked by read_pickle_cache
+        max_entries: Number of entries to keep in the cache directory
+    """
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = cache_file.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_file, "wb") as f:
+            pickle.dump((cache_format, value), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, cache_file)
+
+        entries = sorted(
+            cache_file.parent.glob("*.pkl"),
+            key=lambda p: p.stat().st_mtime,
+            reverse=True,
+        )
+        for stale in entries[max_entries:]:
+            stale.unlink()
+    except OSError:
+        # Caching is best effort; a failed write only costs a later miss
+        pass
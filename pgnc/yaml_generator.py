@@ -1,11 +1,37 @@
 """YAML generation for replication configurations."""
 
+import re
 import yaml
 from pathlib import Path
 from typing import List
 
 from .comparator import ComparisonResult
 
+# Prefer the libyaml-backed dumper when PyYAML was built with it
+try:
+    from yaml import CSafeDumper as SafeDumper
+except ImportError:
+    from yaml import SafeDumper
+
+# Settings of every generated color config (they do not depend on the input)
+REPLICATION_SETTINGS = {
+    "preserve_comments": True,
+    "add_curation_comment": True
+}
+
+# Line width passed to the dumper, wide enough that move lists never wrap
+YAML_LINE_WIDTH = 1 << 16
+
+# Placeholder game entry dumped ahead of each game; replaced by its comments
+_COMMENT_MARKER = "__pgnc_comment__"
+_COMMENT_MARKER_RE = re.compile(r"^( *)- __pgnc_comment__: true\n", re.MULTILINE)
+
+# Diff comment lines, bound once as str.format templates
+_GAME_COMMENT = "{}# Game [{}]: {}\n".format
+_VARIATIONS_COMMENT = "{}# Variations: {} → {}\n".format
+_REMOVED_COMMENT = "{}# Removed: {}\n".format
+_ADDED_COMMENT = "{}# Added: {}\n".format
+
 
 def generate_replication_yaml(
     comparisons: List[ComparisonResult],
@@ -28,55 +54,46 @@ def generate_replication_yaml(
         Path to generated YAML file
     """
     # Build config structure
+    stem = Path(pgn1_path).stem
     config = {
-        "name": f"Replication config: {Path(pgn1_path).stem} → target",
+        "name": f"Replication config: {stem} → target",
         "description": "Auto-generated from pgnc compare - edit as needed",
         "source": pgn1_path,
-        "output": f"{Path(pgn1_path).stem}_replicated",
+        "output": f"{stem}_replicated",
         "configs": []
     }
 
-    # Build games list for the color
-    games_list = []
+    # Create color config
+    color_config = {
+        "color": color,
+        "settings": dict(REPLICATION_SETTINGS),
+        "games": []
+    }
 
+    # Add games, each preceded by a marker entry for its diff comments
     for comparison in comparisons:
-        game_entry = {
+        game = {
             "index": comparison.game1_index,
             "action": "include",
             "name": comparison.game1_name
         }
-
-        # Add remove_variations if there are removed variations
         if comparison.removed_variations:
-            game_entry["remove_variations"] = [
+            game["remove_variations"] = [
                 {"moves": moves} for moves in comparison.removed_variations
             ]
-
-        # Add add_variations if there are added variations
         if comparison.added_variations:
-            game_entry["add_variations"] = [
+            game["add_variations"] = [
                 {"moves": moves} for moves in comparison.added_variations
             ]
 
-        games_list.append(game_entry)
-
-    # Create color config
-    color_config = {
-        "color": color,
-        "settings": {
-            "preserve_comments": True,
-            "add_curation_comment": True
-        },
-        "games": games_list
-    }
+        color_config["games"].append({_COMMENT_MARKER: True})
+        color_config["games"].append(game)
 
     config["configs"].append(color_config)
 
-    # Write YAML with custom formatting
-    yaml_content = _format_yaml_with_comments(config, comparisons)
-
-    with open(output_path, "w") as f:
-        f.write(yaml_content)
+    # Encode once and write the bytes in one go, bypassing the text layer
+    text = _format_yaml_with_comments(config, comparisons)
+    Path(output_path).write_bytes(text.encode("utf-8"))
 
     return output_path
 
@@ -88,65 +105,41 @@ def _format_yaml_with_comments(
     """
     Format YAML with diff comments.
 
+    The body is serialized by PyYAML in one call; the marker entries placed
+    ahead of each game are then swapped for that game's diff comments.
+
     Args:
-        config: Configuration dictionary
-        comparisons: List of comparison results
+        config: Configuration dictionary, games interleaved with markers
+        comparisons: List of comparison results, in marker order
 
     Returns:
-        Formatted YAML string with diff statistics as comments
+        YAML text of the config
     """
-    # Build YAML with diff comments
-    lines = []
+    body = yaml.dump(
+        config,
+        Dumper=SafeDumper,
+        default_flow_style=False,
+        sort_keys=False,
+        allow_unicode=True,
+        width=YAML_LINE_WIDTH
+    )
+
+    # Markers appear in game order, so pair them with the comparisons in turn
+    pending = iter(comparisons)
+
+    def comment_block(match: "re.Match") -> str:
+        indent = match.group(1)
+        comparison = next(pending)
+        block = ["\n",
+                 _GAME_COMMENT(indent, comparison.game1_index, comparison.game1_name),
+                 _VARIATIONS_COMMENT(indent, comparison.total_variations_game1,
+                                     comparison.total_variations_game2)]
+        if comparison.removed_variations:
+            block.append(_REMOVED_COMMENT(indent, len(comparison.removed_variations)))
+        if comparison.added_variations:
+            block.append(_ADDED_COMMENT(indent, len(comparison.added_variations)))
+        return "".join(block)
 
     # Header
-    lines.append(f"# {config['name']}")
-    lines.append(f"# {config['description']}")
-    lines.append("")
-
-    lines.append(f"name: \"{config['name']}\"")
-    lines.append(f"description: \"{config['description']}\"")
-    lines.append(f"source: {config['source']}")
-    lines.append(f"output: {config['output']}")
-    lines.append("")
-    lines.append("configs:")
-
-    for color_config in config["configs"]:
-        lines.append(f"  - color: {color_config['color']}")
-        lines.append("    settings:")
-        for key, value in color_config["settings"].items():
-            lines.append(f"      {key}: {str(value).lower()}")
-        lines.append("    games:")
-
-        # Add games with diff comments
-        for i, game in enumerate(color_config["games"]):
-            comparison = comparisons[i]
-
-            lines.append("")
-            # Add diff statistics as comment
-            lines.append(f"      # Game [{game['index']}]: {game['name']}")
-            lines.append(
-                f"      # Variations: {comparison.total_variations_game1} → {comparison.total_variations_game2}"
-            )
-            if comparison.removed_variations:
-                lines.append(f"      # Removed: {len(comparison.removed_variations)}")
-            if comparison.added_variations:
-                lines.append(f"      # Added: {len(comparison.added_variations)}")
-
-            # Game entry
-            lines.append(f"      - index: {game['index']}")
-            lines.append(f"        action: \"{game['action']}\"")
-            lines.append(f"        name: \"{game['name']}\"")
-
-            # Remove variations
-            if "remove_variations" in game:
-                lines.append("        remove_variations:")
-                for var in game["remove_variations"]:
-                    lines.append(f"          - moves: \"{var['moves']}\"")
-
-            # Add variations
-            if "add_variations" in game:
-                lines.append("        add_variations:")
-                for var in game["add_variations"]:
-                    lines.append(f"          - moves: \"{var['moves']}\"")
-
-    return "\n".join(lines) + "\n"
+    header = f"# {config['name']}\n# {config['description']}\n\n"
+    return header + _COMMENT_MARKER_RE.sub(comment_block, body)
@@ -1,10 +1,12 @@
+from pathlib import Path
+
 from setuptools import setup, find_packages
 
 setup(
     name="pgn-curator",
     version="0.1.0",
     description="Config-driven chess opening repertoire curation tool",
-    long_description=open("README.md").read(),
+    long_description=Path(__file__).with_name("README.md").read_text(encoding="utf-8"),
     long_description_content_type="text/markdown",
     author="Chess Opening Trainer Team",
     url="https://github.com/yourusername/pgnc",